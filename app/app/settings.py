@@ -10,7 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
+import importlib.util
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,6 +39,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "drf_spectacular",
@@ -47,6 +50,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -85,9 +89,72 @@ DATABASES = {
         "NAME": os.environ["DB_NAME"],
         "USER": os.environ["DB_USER"],
         "PASSWORD": os.environ["DB_PASS"],
+        # Check connections are alive before handing them out
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_HEALTH_CHECKS", "true").lower()
+        == "true",
     }
 }
 
+# Connection reuse: psycopg's native pool by default, or persistent
+# per-thread connections when DB_POOL=false (the two can't be combined).
+# https://docs.djangoproject.com/en/5.2/ref/databases/#connection-pool
+
+if os.environ.get("DB_POOL", "true").lower() == "true":
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+            "timeout": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+            "max_idle": float(os.environ.get("DB_POOL_MAX_IDLE", 600)),
+            "max_lifetime": float(os.environ.get("DB_POOL_MAX_LIFETIME", 3600)),
+        }
+    }
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.environ.get("DB_CONN_MAX_AGE", 60))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+
+# A per-process backend (locmem, dummy) can't be invalidated from other
+# processes, so nothing that must be invalidated on writes is cached in it.
+CACHE_SHARED = CACHES["default"]["BACKEND"] not in (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+# Serialized recipe, tag and ingredient lists are cached per user for
+# RECIPE_LIST_CACHE_TIMEOUT seconds when the cache is shared. Writes through
+# the api invalidate them straight away in every process. Otherwise lists
+# are served from the database, still answering conditional GETs with 304s.
+# Set RECIPE_LIST_CACHE=true to cache them anyway in a single process server.
+RECIPE_LIST_CACHE = (
+    os.environ.get("RECIPE_LIST_CACHE", str(CACHE_SHARED)).lower() == "true"
+)
+RECIPE_LIST_CACHE_TIMEOUT = int(os.environ.get("RECIPE_LIST_CACHE_TIMEOUT", 300))
+
+
+# Authenticated users are cached per token in a small in-process LRU and, if
+# the cache backend is shared between processes, in the cache as well.
+# Deleting a token or saving its user invalidates both tiers in this process
+# and the shared tier everywhere, so the local timeout bounds how long other
+# processes may still accept it.
+AUTH_TOKEN_SHARED_CACHE = CACHE_SHARED
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.environ.get("AUTH_TOKEN_CACHE_TIMEOUT", 60))
+AUTH_TOKEN_LOCAL_CACHE_TIMEOUT = int(
+    os.environ.get("AUTH_TOKEN_LOCAL_CACHE_TIMEOUT", 5)
+)
+AUTH_TOKEN_LOCAL_CACHE_SIZE = int(os.environ.get("AUTH_TOKEN_LOCAL_CACHE_SIZE", 1024))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -128,6 +195,30 @@ STATIC_ROOT = "/vol/web/static"
 MEDIA_URL = "/static/media/"
 MEDIA_ROOT = "/vol/web/media"
 
+# Threads generating resized recipe image renditions after upload.
+# 0 generates them inline, once the upload is committed.
+RECIPE_IMAGE_WORKERS = int(os.environ.get("RECIPE_IMAGE_WORKERS", 2))
+
+# Upper bound on the number of recipes accepted by one bulk import request
+RECIPE_IMPORT_MAX_ROWS = int(os.environ.get("RECIPE_IMPORT_MAX_ROWS", 10000))
+
+# Rows per collection in one page of recipes/changes/. Tombstones older than
+# the retention are removed by prune_tombstones, and sync tokens that old are
+# refused so the client syncs in full again.
+SYNC_PAGE_SIZE = int(os.environ.get("SYNC_PAGE_SIZE", 500))
+SYNC_TOMBSTONE_RETENTION = timedelta(
+    days=int(os.environ.get("SYNC_TOMBSTONE_RETENTION_DAYS", 30))
+)
+
+# Response encodings by preference, br and zstd need brotli and zstandard.
+# Levels trade CPU for size, see the benchmark_compression command.
+COMPRESSION_ENCODINGS = os.environ.get("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(
+    ","
+)
+COMPRESSION_LEVELS = {"zstd": 3, "br": 5, "gzip": 6}
+# Smaller bodies are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -135,7 +226,46 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "core.User"
 
-REST_FRAMEWORK = {"DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema"}
+# "orjson" renders and parses JSON with orjson, byte for byte like DRF's
+# own classes but several times faster; "json" uses the DRF classes.
+API_JSON_BACKEND = os.environ.get("API_JSON_BACKEND", "orjson")
+if API_JSON_BACKEND == "orjson" and importlib.util.find_spec("orjson") is None:
+    API_JSON_BACKEND = "json"
+
+REST_FRAMEWORK = {
+    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": [
+        (
+            "core.renderers.ORJSONRenderer"
+            if API_JSON_BACKEND == "orjson"
+            else "rest_framework.renderers.JSONRenderer"
+        ),
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        (
+            "core.parsers.ORJSONParser"
+            if API_JSON_BACKEND == "orjson"
+            else "rest_framework.parsers.JSONParser"
+        ),
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
+
+# Default page size for paginated endpoints and the upper bound for
+# the ``page_size`` query parameter
+API_PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE", 100))
+API_MAX_PAGE_SIZE = int(os.environ.get("API_MAX_PAGE_SIZE", 1000))
+
+# Serve recipe, tag and ingredient reads from async views using the async
+# ORM. asgi.py turns it on, under WSGI async views would only add overhead.
+API_ASYNC_VIEWS = os.environ.get("API_ASYNC_VIEWS", "false").lower() == "true"
+
+# JSON schema file written by the refresh_schema command, at deploy or
+# startup, and served by api/schema/. Unset, the schema is generated by
+# each process on first request.
+API_SCHEMA_FILE = os.environ.get("API_SCHEMA_FILE", "")
 
 SPECTACULAR_SETTINGS = {
     "COMPONENT_SPLIT_TEXT": True,
@@ -1,12 +1,14 @@
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularSwaggerView
 from django.contrib import admin
 from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import path, include
+from core.schema import CachedSchemaView
+from core.views import DatabasePoolStatsView, serve_media
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("api/schema/", SpectacularAPIView.as_view(), name="api-schema"),
+    path("api/schema/", CachedSchemaView.as_view(), name="api-schema"),
     path(
         "api/docs/",
         SpectacularSwaggerView.as_view(url_name="api-schema"),
@@ -14,8 +16,11 @@ urlpatterns = [
     ),
     path("api/user/", include("user.urls", namespace="user")),
     path("api/recipe/", include("recipe.urls", namespace="recipe")),
+    path("api/db-pool/", DatabasePoolStatsView.as_view(), name="db-pool"),
 ]
 
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += static(
+        settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT
+    )
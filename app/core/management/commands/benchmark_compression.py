@@ -0,0 +1,53 @@
+"""
+Django command comparing the response encodings
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from drf_spectacular.generators import SchemaGenerator
+from drf_spectacular.renderers import OpenApiYamlRenderer
+from core.management.commands.benchmark_formats import best_of, sample_recipes
+from core.middleware import COMPRESSORS, compress
+from core.renderers import ORJSONRenderer
+
+LEVELS = {"gzip": [1, 6, 9], "br": [1, 5, 9], "zstd": [1, 3, 9]}
+
+
+def sample_bodies():
+    """The bodies compressed: recipe list pages and the api schema"""
+    renderer = ORJSONRenderer()
+    schema = SchemaGenerator().get_schema(request=None, public=True)
+    return {
+        "recipes x100": renderer.render(sample_recipes(100)),
+        "recipes x1000": renderer.render(sample_recipes(1000)),
+        "schema": OpenApiYamlRenderer().render(schema),
+    }
+
+
+class Command(BaseCommand):
+    """Print ratio and compression throughput per encoding and level"""
+
+    help = "Benchmark gzip, Brotli and zstd on typical api responses"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'body':<14}{'encoding':<10}{'level':>6}{'bytes':>10}"
+            f"{'ratio':>8}{'time':>12}{'MB/s':>9}"
+        )
+        for name, body in sample_bodies().items():
+            self.stdout.write(f"{name:<14}{'identity':<10}{'':>6}{len(body):>10}")
+            for encoding in COMPRESSORS:
+                for level in LEVELS[encoding]:
+                    size = len(compress(encoding, level, body))
+                    seconds = best_of(
+                        options["repeat"], lambda: compress(encoding, level, body)
+                    )
+                    mark = "*" if settings.COMPRESSION_LEVELS[encoding] == level else ""
+                    self.stdout.write(
+                        f"{name:<14}{encoding:<10}{mark + str(level):>6}{size:>10}"
+                        f"{len(body) / size:>8.1f}{seconds * 1000:>9.2f} ms"
+                        f"{len(body) / seconds / 1e6:>9.0f}"
+                    )
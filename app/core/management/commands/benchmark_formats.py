@@ -0,0 +1,84 @@
+"""
+Django command comparing the api response formats
+"""
+
+import gzip
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from core.messagepack import MessagePackParser, MessagePackRenderer
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+FORMATS = [
+    ("json", JSONRenderer(), JSONParser()),
+    ("orjson", ORJSONRenderer(), ORJSONParser()),
+    ("msgpack", MessagePackRenderer(), MessagePackParser()),
+]
+
+
+def sample_recipes(count):
+    """Build a recipe list page shaped like the api's"""
+    return {
+        "next": "http://localhost:8000/api/recipe/recipes/?cursor=cD0xMjM0",
+        "previous": None,
+        "results": [
+            {
+                "id": 100000 + i,
+                "title": f"Slow cooked recipe number {i}",
+                "time_minutes": 5 + i % 120,
+                "price": f"{(i % 400) / 4 + 1:.2f}",
+                "link": f"https://recipes.example.com/{i}",
+                "tags": [
+                    {"id": 500 + (i + j) % 40, "name": f"Tag {(i + j) % 40}"}
+                    for j in range(3)
+                ],
+                "ingredients": [
+                    {"name": f"Ingredient {(i + j) % 200}", "id": 2000 + (i + j) % 200}
+                    for j in range(8)
+                ],
+            }
+            for i in range(count)
+        ],
+    }
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    """Print payload size, encode and decode time per response format"""
+
+    help = "Benchmark JSON against MessagePack on recipe list pages"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 1000])
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'rows':>6} {'format':<8}{'bytes':>10}{'gzip':>9}"
+            f"{'encode':>12}{'decode':>12}"
+        )
+        for rows in options["rows"]:
+            data = sample_recipes(rows)
+            for name, renderer, parser in FORMATS:
+                body = renderer.render(data)
+                encode = best_of(options["repeat"], lambda: renderer.render(data))
+                decode = best_of(
+                    options["repeat"], lambda: parser.parse(io.BytesIO(body))
+                )
+                self.stdout.write(
+                    f"{rows:>6} {name:<8}{len(body):>10}"
+                    f"{len(gzip.compress(body)):>9}"
+                    f"{encode * 1000:>9.2f} ms{decode * 1000:>9.2f} ms"
+                )
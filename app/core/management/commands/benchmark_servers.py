@@ -0,0 +1,237 @@
+"""
+Django command comparing WSGI and ASGI throughput under load
+"""
+
+import asyncio
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.authtoken.models import Token
+from core.models import Ingredient, Recipe, Tag
+
+BENCHMARK_EMAIL = "benchmark-servers@example.com"
+
+# server interface, and whether the async read views are enabled
+MODES = {"wsgi": False, "asgi-sync": False, "asgi": True}
+
+
+def create_sample_data(recipes):
+    """Commit a user with recipes, other processes have to see them"""
+    get_user_model().objects.filter(email=BENCHMARK_EMAIL).delete()
+    user = get_user_model().objects.create_user(email=BENCHMARK_EMAIL, password="x")
+    tags = Tag.objects.bulk_create(Tag(user=user, name=f"Tag {i}") for i in range(20))
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(user=user, name=f"Ingredient {i}") for i in range(50)
+    )
+    created = Recipe.objects.bulk_create(
+        Recipe(user=user, title=f"Recipe {i}", time_minutes=10, price="5.00")
+        for i in range(recipes)
+    )
+    for i, recipe in enumerate(created):
+        tag, ingredient = i % len(tags), i % len(ingredients)
+        recipe.tags.add(*tags[tag:][:3])
+        recipe.ingredients.add(*ingredients[ingredient:][:6])
+    return user, Token.objects.create(user=user), created[0].id
+
+
+def summarize(latencies, seconds, errors):
+    """Throughput and latency percentiles, in requests/s and ms"""
+    cuts = statistics.quantiles(latencies, n=100)
+    return {
+        "rps": len(latencies) / seconds,
+        "p50": cuts[49] * 1000,
+        "p99": cuts[98] * 1000,
+        "errors": errors,
+    }
+
+
+def run_wsgi(url, token, requests, concurrency):
+    """Call the WSGI handler from a pool of threads, as a threaded server does"""
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    parts = urlsplit(url)
+
+    def call():
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": parts.path,
+            "QUERY_STRING": parts.query,
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "HTTP_HOST": "localhost",
+            "HTTP_AUTHORIZATION": f"Token {token}",
+            "wsgi.input": io.BytesIO(),
+            "wsgi.url_scheme": "http",
+            "wsgi.errors": sys.stderr,
+        }
+        statuses = []
+        start = time.perf_counter()
+        body = application(environ, lambda status, headers: statuses.append(status))
+        b"".join(body)
+        body.close()
+        return time.perf_counter() - start, statuses[0].startswith("200")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: call(), range(concurrency * 2)))
+        start = time.perf_counter()
+        results = list(pool.map(lambda _: call(), range(requests)))
+        seconds = time.perf_counter() - start
+    return summarize([r[0] for r in results], seconds, sum(not r[1] for r in results))
+
+
+def run_asgi(url, token, requests, concurrency):
+    """Call the ASGI handler from concurrent tasks on one event loop"""
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+    parts = urlsplit(url)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": parts.path,
+        "raw_path": parts.path.encode(),
+        "query_string": parts.query.encode(),
+        "root_path": "",
+        "headers": [
+            (b"host", b"localhost"),
+            (b"authorization", f"Token {token}".encode()),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80),
+    }
+
+    async def call():
+        sent = asyncio.Event()
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+        statuses = []
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # the client stays connected until the response is sent
+            await sent.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+            elif not message.get("more_body"):
+                sent.set()
+
+        start = time.perf_counter()
+        await application(dict(scope), receive, send)
+        return time.perf_counter() - start, statuses[0] == 200
+
+    async def load(count):
+        limit = asyncio.Semaphore(concurrency)
+
+        async def limited():
+            async with limit:
+                return await call()
+
+        return await asyncio.gather(*(limited() for _ in range(count)))
+
+    async def main():
+        await load(concurrency * 2)
+        start = time.perf_counter()
+        results = await load(requests)
+        return results, time.perf_counter() - start
+
+    results, seconds = asyncio.run(main())
+    return summarize([r[0] for r in results], seconds, sum(not r[1] for r in results))
+
+
+class Command(BaseCommand):
+    """Print requests/s and p50/p99 latency per server interface and endpoint"""
+
+    help = (
+        "Load the recipe api through the WSGI handler and the ASGI handler, "
+        "with the sync (asgi-sync) and the async read views, each in its own "
+        "process. The response cache is disabled unless --cache is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument("--recipes", type=int, default=200)
+        parser.add_argument("--cache", action="store_true")
+        parser.add_argument("--serve", choices=list(MODES), help="internal")
+        parser.add_argument("--url", help="internal")
+        parser.add_argument("--token", help="internal")
+
+    def handle(self, *args, **options):
+        if options["serve"]:
+            run = run_wsgi if options["serve"] == "wsgi" else run_asgi
+            result = run(
+                options["url"],
+                options["token"],
+                options["requests"],
+                options["concurrency"],
+            )
+            self.stdout.write(json.dumps(result))
+            return
+
+        user, token, recipe_id = create_sample_data(options["recipes"])
+        urls = [
+            "/api/recipe/recipes/?page_size=20",
+            f"/api/recipe/recipes/{recipe_id}/",
+            "/api/recipe/tags/",
+        ]
+        try:
+            self.stdout.write(
+                f"{options['concurrency']} concurrent clients, "
+                f"{options['requests']} requests per run"
+            )
+            self.stdout.write(
+                f"{'server':<10}{'endpoint':<36}{'req/s':>9}{'p50':>11}{'p99':>11}"
+            )
+            for url in urls:
+                for mode in MODES:
+                    result = self.run_child(mode, url, token.key, options)
+                    self.stdout.write(
+                        f"{mode:<10}{url:<36}{result['rps']:>9.0f}"
+                        f"{result['p50']:>8.1f} ms{result['p99']:>8.1f} ms"
+                        + (f"  {result['errors']} errors" if result["errors"] else "")
+                    )
+        finally:
+            user.delete()
+
+    def run_child(self, mode, url, token, options):
+        env = {**os.environ, "API_ASYNC_VIEWS": "true" if MODES[mode] else "false"}
+        if options["cache"]:
+            # each server is a single process, its own cache stays valid
+            env["RECIPE_LIST_CACHE"] = "true"
+        else:
+            env["CACHE_BACKEND"] = "django.core.cache.backends.dummy.DummyCache"
+        output = subprocess.run(
+            [
+                sys.executable,
+                os.path.join(settings.BASE_DIR, "manage.py"),
+                "benchmark_servers",
+                f"--serve={mode}",
+                f"--url={url}",
+                f"--token={token}",
+                f"--requests={options['requests']}",
+                f"--concurrency={options['concurrency']}",
+            ],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        return json.loads(output.splitlines()[-1])
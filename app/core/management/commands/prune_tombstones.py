@@ -0,0 +1,22 @@
+"""
+Django command removing old deletion records
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.models import Tombstone
+
+
+class Command(BaseCommand):
+    """Delete tombstones older than SYNC_TOMBSTONE_RETENTION"""
+
+    help = (
+        "Remove deletion records no sync token can ask for anymore, "
+        "run it daily from cron"
+    )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - settings.SYNC_TOMBSTONE_RETENTION
+        count, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"Removed {count} tombstones"))
@@ -0,0 +1,23 @@
+"""
+Django command writing the precomputed api schema
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.schema import write_schema
+
+
+class Command(BaseCommand):
+    """Generate the OpenAPI schema into API_SCHEMA_FILE"""
+
+    help = "Regenerate the schema served by api/schema/"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", default=settings.API_SCHEMA_FILE)
+
+    def handle(self, *args, **options):
+        path = options["file"]
+        if not path:
+            raise CommandError("Set API_SCHEMA_FILE or pass --file")
+        content = write_schema(path)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(content)} bytes to {path}"))
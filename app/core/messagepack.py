@@ -0,0 +1,62 @@
+"""
+MessagePack support for the api, offered when msgpack is installed
+"""
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # optional, MessagePack is not offered without it
+    msgpack = None
+
+_encoder = JSONEncoder()
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Render MessagePack, a compact binary equivalent of the JSON output.
+
+    Values JSON has no type for are converted as for JSON, so a decoded
+    response equals the parsed JSON one.
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_encoder.default, datetime=False)
+
+
+class MessagePackParser(BaseParser):
+    """Parse MessagePack request bodies"""
+
+    media_type = "application/msgpack"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
+
+
+class MessagePackMixin:
+    """Let clients send and receive MessagePack next to the view's formats"""
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if msgpack is None:
+            return renderers
+        return [*renderers, MessagePackRenderer()]
+
+    def get_parsers(self):
+        parsers = super().get_parsers()
+        if msgpack is None:
+            return parsers
+        return [*parsers, MessagePackParser()]
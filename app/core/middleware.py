@@ -0,0 +1,198 @@
+"""
+Response compression for the api
+"""
+
+import zlib
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # optional, br is not offered without it
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional, zstd is not offered without it
+    zstandard = None
+
+# media types already compressed, not worth compressing again
+COMPRESSED_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "font/woff",
+    "application/gzip",
+    "application/x-gzip",
+    "application/zip",
+    "application/zstd",
+    "application/pdf",
+    "application/octet-stream",
+)
+TEXT_IMAGE_TYPES = ("image/svg+xml",)
+# pages that may carry a CSRF token next to reflected input, compressing them
+# would let an attacker recover the token from the sizes (BREACH)
+SECRET_TYPES = ("text/html", "application/xhtml+xml")
+
+
+def gzip_compressor(level):
+    """Return the (compress, flush) pair of a gzip stream"""
+    # wbits 31 writes the gzip header and trailer
+    stream = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return stream.compress, stream.flush
+
+
+def brotli_compressor(level):
+    """Return the (compress, flush) pair of a Brotli stream"""
+    stream = brotli.Compressor(quality=level)
+    return stream.process, stream.finish
+
+
+def zstd_compressor(level):
+    """Return the (compress, flush) pair of a Zstandard stream"""
+    stream = zstandard.ZstdCompressor(level=level).compressobj()
+    return stream.compress, stream.flush
+
+
+COMPRESSORS = {"gzip": gzip_compressor}
+if brotli is not None:
+    COMPRESSORS["br"] = brotli_compressor
+if zstandard is not None:
+    COMPRESSORS["zstd"] = zstd_compressor
+
+
+def compress(encoding, level, data):
+    """Compress a whole body"""
+    feed, flush = COMPRESSORS[encoding](level)
+    return feed(data) + flush()
+
+
+def compress_sequence(encoding, level, chunks):
+    """Compress an iterator of chunks, yielding output as the stream emits it"""
+    feed, flush = COMPRESSORS[encoding](level)
+    for chunk in chunks:
+        data = feed(chunk)
+        if data:
+            yield data
+    yield flush()
+
+
+async def acompress_sequence(encoding, level, chunks):
+    """compress_sequence for an async iterator of chunks"""
+    feed, flush = COMPRESSORS[encoding](level)
+    async for chunk in chunks:
+        data = feed(chunk)
+        if data:
+            yield data
+    yield flush()
+
+
+def parse_accept_encoding(header):
+    """Map each coding of an Accept-Encoding header to its q value"""
+    accepted = {}
+    for item in header.split(","):
+        coding, *params = item.split(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def negotiate_encoding(header, encodings):
+    """
+    Return the encoding the client rates highest, or None.
+
+    encodings lists the server's encodings by preference, which breaks ties.
+    """
+    accepted = parse_accept_encoding(header)
+    fallback = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding, fallback)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with the best of zstd, Brotli and gzip the client
+    accepts.
+
+    COMPRESSION_ENCODINGS orders the encodings, those whose library isn't
+    installed are left out. Bodies under COMPRESSION_MIN_SIZE bytes,
+    compressed media types, HTML pages and responses already carrying a
+    Content-Encoding are sent as they are. Streaming responses are
+    compressed as they stream.
+    """
+
+    def encodings(self):
+        return [
+            encoding
+            for encoding in settings.COMPRESSION_ENCODINGS
+            if encoding in COMPRESSORS
+        ]
+
+    def compressible(self, response):
+        if response.has_header("Content-Encoding") or response.has_header(
+            "Content-Range"
+        ):
+            return False
+        media_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if media_type.startswith(COMPRESSED_TYPES) and media_type not in (
+            TEXT_IMAGE_TYPES
+        ):
+            return False
+        if media_type in SECRET_TYPES:
+            return False
+        if response.streaming:
+            length = response.get("Content-Length")
+            return length is None or int(length) >= settings.COMPRESSION_MIN_SIZE
+        return len(response.content) >= settings.COMPRESSION_MIN_SIZE
+
+    def process_response(self, request, response):
+        if not self.compressible(response):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate_encoding(
+            request.META.get("HTTP_ACCEPT_ENCODING", ""), self.encodings()
+        )
+        if encoding is None:
+            return response
+        level = settings.COMPRESSION_LEVELS[encoding]
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_sequence(
+                    encoding, level, response.streaming_content
+                )
+            else:
+                response.streaming_content = compress_sequence(
+                    encoding, level, response.streaming_content
+                )
+            # the compressed size is only known once streamed
+            del response.headers["Content-Length"]
+        else:
+            content = compress(encoding, level, response.content)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response.headers["Content-Length"] = str(len(content))
+
+        # the encoded bytes differ, so a strong validator becomes weak
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
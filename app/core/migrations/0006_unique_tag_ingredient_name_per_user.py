@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:47
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Fold duplicate (user, name) rows into the oldest one before constraining"""
+    Recipe = apps.get_model("core", "Recipe")
+    for model_name, field in [("Tag", "tags"), ("Ingredient", "ingredients")]:
+        model = apps.get_model("core", model_name)
+        through = getattr(Recipe, field).through
+        fk = f"{model_name.lower()}_id"
+        duplicates = (
+            model.objects.values("user_id", "name")
+            .annotate(keep=Min("id"), total=Count("id"))
+            .filter(total__gt=1)
+        )
+        for dup in duplicates:
+            drop = model.objects.filter(
+                user_id=dup["user_id"], name=dup["name"]
+            ).exclude(id=dup["keep"])
+            drop_ids = list(drop.values_list("id", flat=True))
+            linked = through.objects.filter(**{f"{fk}__in": drop_ids})
+            kept = set(
+                through.objects.filter(**{fk: dup["keep"]}).values_list(
+                    "recipe_id", flat=True
+                )
+            )
+            through.objects.bulk_create(
+                [
+                    through(recipe_id=recipe_id, **{fk: dup["keep"]})
+                    for recipe_id in set(linked.values_list("recipe_id", flat=True))
+                    - kept
+                ]
+            )
+            linked.delete()
+            drop.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_recipe_image"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="ingredient",
+            constraint=models.UniqueConstraint(
+                fields=("user", "name"), name="unique_ingredient_name_per_user"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="tag",
+            constraint=models.UniqueConstraint(
+                fields=("user", "name"), name="unique_tag_name_per_user"
+            ),
+        ),
+    ]
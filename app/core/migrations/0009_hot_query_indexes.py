@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:40
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+def through_index(table, columns):
+    """Build a concurrent index on an auto-created m2m through table"""
+    name = f"{table}_{'_'.join(columns)}_idx"
+    return migrations.RunSQL(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" '
+        f"ON \"{table}\" ({', '.join(columns)})",
+        reverse_sql=f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"',
+    )
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("core", "0008_tombstone"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="recipe",
+            index=models.Index(fields=["user", "-id"], name="recipe_user_id_desc_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="recipe",
+            index=models.Index(
+                fields=["user", "updated_at"], name="recipe_user_updated_idx"
+            ),
+        ),
+        # Reverse probes from a tag or ingredient to its recipes (assigned_only,
+        # touching recipes on rename) become index-only scans. The forward
+        # direction is already covered by the (recipe_id, ...) unique index.
+        through_index("core_recipe_tags", ["tag_id", "recipe_id"]),
+        through_index("core_recipe_ingredients", ["ingredient_id", "recipe_id"]),
+    ]
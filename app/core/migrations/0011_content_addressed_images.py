@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:12
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_recipe_image_renditions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StoredFile",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=255, primary_key=True, serialize=False),
+                ),
+                ("refs", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=models.ImageField(
+                null=True,
+                storage=core.storage.get_recipe_image_storage,
+                upload_to=core.models.recipe_image_file_path,
+            ),
+        ),
+    ]
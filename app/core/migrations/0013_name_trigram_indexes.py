@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:26
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+INDEXES = [
+    (
+        "ingredient",
+        django.contrib.postgres.indexes.GinIndex(
+            django.contrib.postgres.indexes.OpClass(
+                django.db.models.functions.text.Upper("name"), name="gin_trgm_ops"
+            ),
+            name="ingredient_name_trgm_idx",
+        ),
+    ),
+    (
+        "tag",
+        django.contrib.postgres.indexes.GinIndex(
+            django.contrib.postgres.indexes.OpClass(
+                django.db.models.functions.text.Upper("name"), name="gin_trgm_ops"
+            ),
+            name="tag_name_trgm_idx",
+        ),
+    ),
+]
+
+
+def trigram_available(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def create_indexes(apps, schema_editor):
+    """Install pg_trgm and index the names, a server without it goes unindexed"""
+    if not trigram_available(schema_editor):
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for model_name, index in INDEXES:
+        model = apps.get_model("core", model_name)
+        schema_editor.add_index(model, index, concurrently=True)
+
+
+def drop_indexes(apps, schema_editor):
+    for _model_name, index in INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("core", "0012_recipe_search_vector"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=index)
+                for model_name, index in INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(create_indexes, drop_indexes),
+            ],
+        ),
+    ]
@@ -1,20 +1,24 @@
 from django.db import models
-import uuid
 import os
 from django.conf import settings
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from .storage import get_recipe_image_storage
 from django.contrib.auth.models import (
     BaseUserManager,
     PermissionsMixin,
     AbstractBaseUser,
 )
 
+# text search configuration of the recipe search vector and queries
+SEARCH_CONFIG = "english"
+
 
 def recipe_image_file_path(instance, filename):
-    """Generate file path for recipe image"""
+    """Generate file path for recipe image, the storage names it by content"""
     ext = os.path.splitext(filename)[1]
-    filename = f"{uuid.uuid4()}{ext}"
-
-    return os.path.join("uploads", "recipe", filename)
+    return os.path.join("uploads", "recipe", f"image{ext}")
 
 
 class UserManager(BaseUserManager):
@@ -57,7 +61,29 @@ class Recipe(models.Model):
     link = models.CharField(blank=True, max_length=250)
     tags = models.ManyToManyField("Tag")
     ingredients = models.ManyToManyField("Ingredient")
-    image = models.ImageField(upload_to=recipe_image_file_path, null=True)
+    image = models.ImageField(
+        upload_to=recipe_image_file_path, storage=get_recipe_image_storage, null=True
+    )
+    # rendition name -> storage path, empty until the image is processed
+    image_renditions = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # maintained by postgres on every write, bulk ones included
+    search_vector = models.GeneratedField(
+        expression=SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="B", config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            # list and pagination: WHERE user_id = ? ORDER BY id DESC
+            models.Index(fields=["user", "-id"], name="recipe_user_id_desc_idx"),
+            # list validators and delta sync: max(updated_at), updated_at >= ?
+            models.Index(fields=["user", "updated_at"], name="recipe_user_updated_idx"),
+            # search: search_vector @@ query
+            GinIndex(fields=["search_vector"], name="recipe_search_vector_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -66,6 +92,21 @@ class Recipe(models.Model):
 class Tag(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"], name="unique_tag_name_per_user"
+            )
+        ]
+        indexes = [
+            # autocomplete: UPPER(name) LIKE 'Q%' or UPPER(name) % q, needs pg_trgm
+            GinIndex(
+                OpClass(Upper("name"), name="gin_trgm_ops"),
+                name="tag_name_trgm_idx",
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -76,6 +117,46 @@ class Ingredient(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
     name = models.CharField(max_length=250)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"], name="unique_ingredient_name_per_user"
+            )
+        ]
+        indexes = [
+            # autocomplete: UPPER(name) LIKE 'Q%' or UPPER(name) % q, needs pg_trgm
+            GinIndex(
+                OpClass(Upper("name"), name="gin_trgm_ops"),
+                name="ingredient_name_trgm_idx",
+            )
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class Tombstone(models.Model):
+    """Record of a deleted recipe, tag or ingredient for delta sync"""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "deleted_at"])]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id}"
+
+
+class StoredFile(models.Model):
+    """Reference count of a content addressed file in media storage"""
+
+    name = models.CharField(max_length=255, primary_key=True)
+    refs = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.name
@@ -0,0 +1,26 @@
+"""
+Parsers shared by the api
+"""
+
+import codecs
+import io
+
+import orjson
+from rest_framework.parsers import JSONParser, get_encoding
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser decoding UTF-8 bodies with orjson"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = get_encoding(parser_context or {})
+        if codecs.lookup(encoding).name != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read() if stream is not None else b""
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # let JSONParser accept what orjson can't (integers beyond 64
+            # bits) and word the errors for what it rejects as well
+            return super().parse(io.BytesIO(body), media_type, parser_context)
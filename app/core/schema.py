@@ -0,0 +1,116 @@
+"""
+Precomputed OpenAPI schema, served with conditional GET
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.http import HttpResponse
+from drf_spectacular.renderers import OpenApiJsonRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+
+
+def generate_schema():
+    """Generate the public schema of the api"""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    return generator.get_schema(request=None, public=True)
+
+
+def write_schema(path, schema=None):
+    """Write the schema as JSON, replacing path only once fully written"""
+    content = OpenApiJsonRenderer().render(schema or generate_schema())
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=directory, prefix=".schema-", delete=False
+    ) as tmp:
+        tmp.write(content)
+    # temporary files are private, the server may run as another user
+    os.chmod(tmp.name, 0o644)
+    os.replace(tmp.name, path)
+    return content
+
+
+class SchemaCache:
+    """
+    The schema and its renderings, built once per process.
+
+    With API_SCHEMA_FILE set the schema is read from that file, and read
+    again whenever refresh_schema replaces it. Otherwise it is generated on
+    first use.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self._version = None
+        self._schema = None
+        self._rendered = {}
+
+    def _current_version(self):
+        path = settings.API_SCHEMA_FILE
+        if not path:
+            return "generated"
+        try:
+            return path, os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return "generated"
+
+    def _load(self, version):
+        if version == "generated":
+            return generate_schema()
+        with open(version[0], "rb") as schema_file:
+            return json.load(schema_file)
+
+    def get(self, renderer):
+        """Return the (body, etag) pair of the schema rendered by renderer"""
+        version = self._current_version()
+        with self._lock:
+            if version != self._version:
+                self._schema = self._load(version)
+                self._rendered = {}
+                self._version = version
+            if renderer.format not in self._rendered:
+                body = renderer.render(self._schema, renderer_context={})
+                digest = hashlib.md5(body, usedforsecurity=False).hexdigest()
+                self._rendered[renderer.format] = body, quote_etag(digest)
+            return self._rendered[renderer.format]
+
+
+schema_cache = SchemaCache()
+
+
+class CachedSchemaView(SpectacularAPIView):
+    """
+    SpectacularAPIView serving the precomputed schema.
+
+    Requests for another version or language are generated as before.
+    """
+
+    def _get_schema_response(self, request):
+        version = (
+            self.api_version or request.version or self._get_version_parameter(request)
+        )
+        if version or request.GET.get("lang") or not self.serve_public:
+            return super()._get_schema_response(request)
+
+        renderer = request.accepted_renderer
+        body, etag = schema_cache.get(renderer)
+        content_type = request.accepted_media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+        response = HttpResponse(body, content_type=content_type)
+        response["Content-Disposition"] = (
+            f'inline; filename="{self._get_filename(request, version)}"'
+        )
+        response["ETag"] = etag
+        patch_cache_control(response, no_cache=True)
+        return get_conditional_response(request, etag=etag, response=response)
@@ -0,0 +1,39 @@
+"""
+Signal handlers for the core models
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import User, Recipe, Tag, Ingredient, Tombstone
+from .storage import release_recipe_image
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    """Log deletions so sync clients can drop their copies"""
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is User:
+        # the whole account is going away, nobody is left to sync
+        return
+    Tombstone.objects.create(
+        user_id=instance.user_id,
+        model=sender._meta.model_name,
+        object_id=instance.pk,
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def release_recipe_image_files(sender, instance, **kwargs):
+    """Drop the deleted recipe's references to its image files"""
+    if instance.image:
+        transaction.on_commit(
+            partial(
+                release_recipe_image, instance.image.name, instance.image_renditions
+            )
+        )
@@ -0,0 +1,106 @@
+"""
+Content addressed, reference counted file storage
+"""
+
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Store each distinct file once, named by the SHA-256 of its content.
+
+    Only the directory and extension of the requested name are kept. Every
+    save takes a reference on the file and release() drops one, deleting
+    the file when nothing refers to it anymore.
+
+    The reference is taken in the caller's transaction, so save inside the
+    transaction writing the row that refers to the file: if it rolls back,
+    so does the reference. A file left without one is adopted by the next
+    save of the same content.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # names are derived from content, a clash is the same file
+        return name
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+        os.makedirs(self.path(directory), exist_ok=True)
+
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(
+            dir=self.path(directory), prefix=".upload-", delete=False
+        ) as tmp:
+            try:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            except BaseException:
+                os.unlink(tmp.name)
+                raise
+        hexdigest = digest.hexdigest()
+        name = os.path.join(directory, hexdigest[:2], f"{hexdigest}{ext}")
+
+        # take the reference before the file is in place, so a concurrent
+        # release of the same content can't delete it from under us. The
+        # row stays locked until the caller's transaction ends.
+        self._acquire(name)
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(tmp.name, self.file_permissions_mode)
+        # an atomic rename, readers never see a partial file
+        os.replace(tmp.name, full_path)
+        return name
+
+    def _acquire(self, name):
+        from core.models import StoredFile
+
+        with transaction.atomic():
+            if StoredFile.objects.filter(name=name).update(refs=F("refs") + 1):
+                return
+            try:
+                with transaction.atomic():
+                    StoredFile.objects.create(name=name, refs=1)
+            except IntegrityError:
+                StoredFile.objects.filter(name=name).update(refs=F("refs") + 1)
+
+    def release(self, name):
+        """Drop a reference to a file, deleting it once unreferenced"""
+        from core.models import StoredFile
+
+        if not name:
+            return
+        with transaction.atomic():
+            stored = StoredFile.objects.select_for_update().filter(name=name).first()
+            if stored is None:
+                # not content addressed (uploaded before deduplication)
+                return
+            if stored.refs > 1:
+                stored.refs -= 1
+                stored.save(update_fields=["refs"])
+                return
+            # delete while holding the row lock, a concurrent save of the
+            # same content waits and then writes the file again
+            stored.delete()
+            self.delete(name)
+
+
+recipe_image_storage = ContentAddressedStorage()
+
+
+def get_recipe_image_storage():
+    return recipe_image_storage
+
+
+def release_recipe_image(name, renditions):
+    """Drop the references a recipe held on its image and its renditions"""
+    for path in [name, *renditions.values()]:
+        recipe_image_storage.release(path)
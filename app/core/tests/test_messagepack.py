@@ -0,0 +1,107 @@
+"""
+Tests for the MessagePack renderer, parser and view mixin
+"""
+
+import io
+import msgpack
+from decimal import Decimal
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from core.messagepack import MessagePackParser, MessagePackRenderer
+from core.models import Recipe, Tag
+from core.tests.test_renderers import SAMPLES
+
+
+class MessagePackTests(SimpleTestCase):
+    """Test the MessagePack renderer and parser"""
+
+    def test_round_trip_matches_json(self):
+        """Test a decoded payload equals the parsed JSON of the same data"""
+        for name, value in SAMPLES.items():
+            if name == "keys":
+                continue
+            with self.subTest(name):
+                packed = MessagePackRenderer().render(value)
+                as_json = JSONParser().parse(io.BytesIO(JSONRenderer().render(value)))
+                self.assertEqual(MessagePackParser().parse(io.BytesIO(packed)), as_json)
+
+    def test_invalid_body(self):
+        for body in [b"", b"\xc1", b"\x92\x01", b"\x81\x01\x02"]:
+            with self.subTest(body):
+                with self.assertRaises(ParseError):
+                    MessagePackParser().parse(io.BytesIO(body))
+
+
+class MessagePackApiTests(TestCase):
+    """Test MessagePack is negotiated on the api endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="shitman@example.com", password="shitman"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_in_msgpack(self):
+        recipe = Recipe.objects.create(
+            user=self.user, title="Soup", time_minutes=5, price=Decimal("5.5")
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+        url = reverse("recipe:recipe-list")
+
+        res = self.client.get(url, HTTP_ACCEPT="application/msgpack")
+
+        self.assertEqual(res["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(res.content), self.client.get(url).json())
+
+    def test_create_from_msgpack(self):
+        payload = {"title": "Soup", "time_minutes": 5, "price": "2.00"}
+
+        res = self.client.post(
+            reverse("recipe:recipe-list"),
+            msgpack.packb(payload),
+            content_type="application/msgpack",
+            HTTP_ACCEPT="application/msgpack",
+        )
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(msgpack.unpackb(res.content)["title"], "Soup")
+
+    def test_errors_in_msgpack(self):
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.patch(
+            reverse("recipe:tag-detail", args=[tag.id]),
+            b"\xc1",
+            content_type="application/msgpack",
+            HTTP_ACCEPT="application/msgpack",
+        )
+
+        self.assertEqual(res.status_code, 400)
+        self.assertIn("detail", msgpack.unpackb(res.content))
+
+    def test_user_views_in_msgpack(self):
+        client = APIClient()
+        res = client.post(
+            reverse("user:token"),
+            msgpack.packb({"email": "shitman@example.com", "password": "shitman"}),
+            content_type="application/msgpack",
+            HTTP_ACCEPT="application/msgpack",
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("token", msgpack.unpackb(res.content))
+
+    @patch("core.messagepack.msgpack", None)
+    def test_not_offered_without_msgpack(self):
+        res = self.client.get(
+            reverse("recipe:recipe-list"), HTTP_ACCEPT="application/msgpack"
+        )
+
+        self.assertEqual(res.status_code, 406)
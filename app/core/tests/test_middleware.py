@@ -0,0 +1,220 @@
+"""
+Tests for the compression middleware
+"""
+
+import asyncio
+import gzip
+import random
+import brotli
+import zstandard
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core.middleware import CompressionMiddleware, negotiate_encoding
+from core.models import Recipe
+
+BODY = b'{"title": "Sample recipe", "time_minutes": 10}' * 100
+JSON = "application/json"
+CHUNKS = [BODY[index:][:100] for index in range(0, len(BODY), 100)]
+
+DECOMPRESS = {
+    "gzip": gzip.decompress,
+    "br": brotli.decompress,
+    "zstd": lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data),
+}
+
+
+class NegotiateEncodingTests(SimpleTestCase):
+    """Tests for Accept-Encoding negotiation"""
+
+    encodings = ["zstd", "br", "gzip"]
+
+    def test_server_preference_breaks_ties(self):
+        self.assertEqual(negotiate_encoding("gzip, br", self.encodings), "br")
+        self.assertEqual(
+            negotiate_encoding("gzip, deflate, br, zstd", self.encodings), "zstd"
+        )
+
+    def test_quality_values(self):
+        self.assertEqual(
+            negotiate_encoding("zstd;q=0.5, gzip;q=0.8", self.encodings), "gzip"
+        )
+        self.assertEqual(negotiate_encoding("zstd;q=0, gzip", self.encodings), "gzip")
+        self.assertEqual(negotiate_encoding("BR; Q=1", self.encodings), "br")
+
+    def test_wildcard(self):
+        self.assertEqual(negotiate_encoding("*", self.encodings), "zstd")
+        self.assertEqual(negotiate_encoding("zstd;q=0, *", self.encodings), "br")
+        self.assertIsNone(negotiate_encoding("*;q=0", self.encodings))
+
+    def test_nothing_acceptable(self):
+        self.assertIsNone(negotiate_encoding("", self.encodings))
+        self.assertIsNone(negotiate_encoding("identity, deflate", self.encodings))
+        self.assertIsNone(negotiate_encoding("gzip;q=bad", self.encodings))
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressionMiddlewareTests(SimpleTestCase):
+    """Tests for the compressed responses"""
+
+    def process(self, response, accept="gzip, deflate, br, zstd"):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_each_encoding(self):
+        for encoding, decompress in DECOMPRESS.items():
+            with self.subTest(encoding=encoding):
+                res = self.process(
+                    HttpResponse(BODY, content_type=JSON), accept=encoding
+                )
+
+                self.assertEqual(res["Content-Encoding"], encoding)
+                self.assertEqual(res["Content-Length"], str(len(res.content)))
+                self.assertLess(len(res.content), len(BODY))
+                self.assertEqual(decompress(res.content), BODY)
+                self.assertEqual(res["Vary"], "Accept-Encoding")
+
+    def test_preferred_encoding_order(self):
+        res = self.process(HttpResponse(BODY, content_type=JSON))
+        self.assertEqual(res["Content-Encoding"], "zstd")
+
+        with self.settings(COMPRESSION_ENCODINGS=["gzip", "br"]):
+            res = self.process(HttpResponse(BODY, content_type=JSON))
+        self.assertEqual(res["Content-Encoding"], "gzip")
+
+    def test_small_body_not_compressed(self):
+        res = self.process(HttpResponse(BODY[:1000], content_type=JSON))
+
+        self.assertFalse(res.has_header("Content-Encoding"))
+        self.assertFalse(res.has_header("Vary"))
+        self.assertEqual(res.content, BODY[:1000])
+
+    def test_not_accepted(self):
+        res = self.process(HttpResponse(BODY, content_type=JSON), accept="identity")
+
+        self.assertFalse(res.has_header("Content-Encoding"))
+        self.assertEqual(res["Vary"], "Accept-Encoding")
+        self.assertEqual(res.content, BODY)
+
+    def test_compressed_media_skipped(self):
+        for content_type in ["image/jpeg", "application/zip", "font/woff2"]:
+            with self.subTest(content_type=content_type):
+                res = self.process(HttpResponse(BODY, content_type=content_type))
+                self.assertFalse(res.has_header("Content-Encoding"))
+
+        res = self.process(HttpResponse(BODY, content_type="image/svg+xml"))
+        self.assertEqual(res["Content-Encoding"], "zstd")
+
+    def test_html_skipped(self):
+        for content_type in ["text/html; charset=utf-8", "application/xhtml+xml"]:
+            with self.subTest(content_type=content_type):
+                res = self.process(HttpResponse(BODY, content_type=content_type))
+
+                self.assertFalse(res.has_header("Content-Encoding"))
+                self.assertEqual(res.content, BODY)
+
+    def test_already_encoded_skipped(self):
+        response = HttpResponse(BODY, content_type=JSON)
+        response["Content-Encoding"] = "gzip"
+
+        res = self.process(response, accept="br")
+
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertEqual(res.content, BODY)
+
+    def test_incompressible_body_sent_as_is(self):
+        body = random.Random(0).randbytes(4096)
+
+        res = self.process(HttpResponse(body, content_type="text/plain"), accept="gzip")
+
+        self.assertFalse(res.has_header("Content-Encoding"))
+        self.assertEqual(res.content, body)
+
+    def test_etag_made_weak(self):
+        response = HttpResponse(BODY, content_type=JSON)
+        response["ETag"] = '"abc"'
+
+        res = self.process(response)
+
+        self.assertEqual(res["ETag"], 'W/"abc"')
+
+    def test_streaming(self):
+        for encoding, decompress in DECOMPRESS.items():
+            with self.subTest(encoding=encoding):
+                res = self.process(
+                    StreamingHttpResponse(iter(CHUNKS), content_type=JSON),
+                    accept=encoding,
+                )
+
+                self.assertEqual(res["Content-Encoding"], encoding)
+                self.assertFalse(res.has_header("Content-Length"))
+                self.assertEqual(decompress(b"".join(res.streaming_content)), BODY)
+
+    def test_streaming_small_content_length_skipped(self):
+        response = StreamingHttpResponse(iter([b"small"]), content_type=JSON)
+        response["Content-Length"] = "5"
+
+        res = self.process(response)
+
+        self.assertFalse(res.has_header("Content-Encoding"))
+
+    def test_async_streaming(self):
+        async def chunks():
+            for chunk in CHUNKS:
+                yield chunk
+
+        async def collect(content):
+            return b"".join([chunk async for chunk in content])
+
+        res = self.process(
+            StreamingHttpResponse(chunks(), content_type=JSON), accept="br"
+        )
+
+        self.assertEqual(res["Content-Encoding"], "br")
+        body = asyncio.run(collect(res.streaming_content))
+        self.assertEqual(brotli.decompress(body), BODY)
+
+
+class CompressionApiTests(TestCase):
+    """Tests for compression of api responses"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Recipe.objects.bulk_create(
+            Recipe(user=self.user, title=f"Recipe {i}", time_minutes=5, price="5.00")
+            for i in range(30)
+        )
+
+    def test_recipe_list_compressed(self):
+        plain = self.client.get(reverse("recipe:recipe-list"))
+        res = self.client.get(reverse("recipe:recipe-list"), HTTP_ACCEPT_ENCODING="br")
+
+        self.assertEqual(res["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(res.content), plain.content)
+
+    def test_browsable_api_not_compressed(self):
+        res = self.client.get(
+            reverse("recipe:recipe-list"),
+            HTTP_ACCEPT="text/html",
+            HTTP_ACCEPT_ENCODING="br",
+        )
+
+        self.assertTrue(res["Content-Type"].startswith("text/html"))
+        self.assertFalse(res.has_header("Content-Encoding"))
+
+    def test_export_streams_compressed(self):
+        res = self.client.get(
+            reverse("recipe:recipe-export"),
+            {"export_format": "ndjson"},
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        lines = gzip.decompress(b"".join(res.streaming_content)).splitlines()
+        self.assertEqual(len(lines), 30)
@@ -1,8 +1,8 @@
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from decimal import Decimal
 from core import models
-from unittest.mock import patch
 
 
 def create_user(email="example@example.com", password="shitman"):
@@ -71,6 +71,15 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(tag), tag.name)
 
+    def test_tag_name_unique_per_user(self):
+        """Test a user cannot have two tags with the same name"""
+        user = create_user()
+        models.Tag.objects.create(user=user, name="Vegan")
+        models.Tag.objects.create(user=create_user("other@example.com"), name="Vegan")
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name="Vegan")
+
     def test_craete_ingredient(self):
         """Test creating an ingredient successful"""
         user = create_user()
@@ -79,11 +88,29 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(ingredient), ingredient.name)
 
-    @patch("core.models.uuid.uuid4")
-    def test_recipe_filename_uuid(self, mock_uuid):
-        """Test generating image path"""
-        uuid = "test-uuid"
-        mock_uuid.return_value = uuid
+    def test_delete_records_tombstone(self):
+        """Test deleting a tag leaves a tombstone for sync"""
+        user = create_user()
+        tag = models.Tag.objects.create(user=user, name="Vegan")
+        tag_id = tag.id
+
+        tag.delete()
+
+        tombstone = models.Tombstone.objects.get(user=user)
+        self.assertEqual(tombstone.model, "tag")
+        self.assertEqual(tombstone.object_id, tag_id)
+
+    def test_delete_user_skips_tombstones(self):
+        """Test deleting a user does not log their data as deleted"""
+        user = create_user()
+        models.Tag.objects.create(user=user, name="Vegan")
+
+        user.delete()
+
+        self.assertFalse(models.Tombstone.objects.exists())
+
+    def test_recipe_image_file_path(self):
+        """Test generating image path keeps the directory and extension"""
         file_path = models.recipe_image_file_path(None, "example.jpg")
 
-        self.assertEqual(file_path, f"uploads/recipe/{uuid}.jpg")
+        self.assertEqual(file_path, "uploads/recipe/image.jpg")
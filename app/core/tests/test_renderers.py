@@ -0,0 +1,138 @@
+"""
+Tests for the orjson renderer and parser
+"""
+
+import io
+import uuid
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+from core.models import Recipe, Tag
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+SAMPLES = {
+    "scalars": [1, -2, 0.5, 1234.5678, True, False, None, "", 2**63 - 1],
+    "unicode": {"name": "Crème brûlée 🍮", "sep": "a\u2028b\u2029c", "ctl": "\x00\t"},
+    "decimal": {"price": Decimal("5.50"), "big": Decimal("12345.678")},
+    "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "datetimes": [
+        datetime(2026, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc),
+        datetime(2026, 1, 2, 3, 4, 5, 123456, tzinfo=dt_timezone.utc),
+        datetime(2026, 1, 2, 3, 4, 5, tzinfo=dt_timezone(timedelta(hours=2))),
+        datetime(2026, 1, 2, 3, 4, 5, 60),
+        date(2026, 1, 2),
+        time(3, 4, 5, 600),
+    ],
+    "timedelta": timedelta(minutes=90),
+    "lazy": gettext_lazy("This field is required."),
+    "keys": {1: "int", None: "none", False: "bool"},
+    "containers": (
+        ReturnList([1, 2], serializer=None),
+        {"a": ReturnDict(serializer=None)},
+    ),
+    "nested": [{"id": i, "tags": [{"id": i, "name": f"t{i}"}]} for i in range(3)],
+}
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """Test the renderer matches JSONRenderer byte for byte"""
+
+    def test_samples_render_identically(self):
+        for name, value in SAMPLES.items():
+            with self.subTest(name):
+                self.assertEqual(
+                    ORJSONRenderer().render(value), JSONRenderer().render(value)
+                )
+
+    def test_exponent_floats(self):
+        """Test floats in exponent notation differ only in spelling"""
+        value = [1.25e-7, 1e16]
+        rendered = ORJSONRenderer().render(value)
+
+        self.assertEqual(rendered, b"[1.25e-7,1e16]")
+        self.assertEqual(JSONParser().parse(io.BytesIO(rendered)), value)
+
+    def test_none_renders_empty(self):
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_indent_requested(self):
+        """Test indented output is left to JSONRenderer"""
+        media_type = "application/json; indent=4"
+        self.assertEqual(
+            ORJSONRenderer().render(SAMPLES["nested"], media_type),
+            JSONRenderer().render(SAMPLES["nested"], media_type),
+        )
+
+
+class ORJSONParserTests(SimpleTestCase):
+    """Test the parser matches JSONParser"""
+
+    def parse(self, parser, body, encoding="utf-8"):
+        return parser.parse(io.BytesIO(body), parser_context={"encoding": encoding})
+
+    def test_parses_like_json_parser(self):
+        body = JSONRenderer().render(SAMPLES["unicode"] | {"n": [1, 2.5, None]})
+        self.assertEqual(
+            self.parse(ORJSONParser(), body), self.parse(JSONParser(), body)
+        )
+
+    def test_big_integers(self):
+        """Test integers orjson can't hold still parse"""
+        self.assertEqual(self.parse(ORJSONParser(), b"[18446744073709551616]"), [2**64])
+
+    def test_invalid_json(self):
+        for body in [b"{oops", b"[NaN]", b""]:
+            with self.subTest(body):
+                with self.assertRaises(ParseError):
+                    self.parse(ORJSONParser(), body)
+
+    def test_other_encodings(self):
+        body = '{"name": "Crème"}'.encode("latin-1")
+        self.assertEqual(self.parse(ORJSONParser(), body, "latin-1"), {"name": "Crème"})
+
+
+class JSONBackendApiTests(TestCase):
+    """Test api responses are the same bytes with either JSON backend"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="shitman@example.com", password="shitman"
+        )
+        self.client.force_authenticate(self.user)
+        recipe = Recipe.objects.create(
+            user=self.user, title="Crème brûlée", time_minutes=5, price=Decimal("5.5")
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Dessert"))
+
+    def test_recipe_list_bytes(self):
+        url = reverse("recipe:recipe-list")
+        res = self.client.get(url)
+        self.assertIsInstance(res.accepted_renderer, ORJSONRenderer)
+
+        with override_settings(
+            REST_FRAMEWORK={"DEFAULT_RENDERER_CLASSES": [JSONRenderer]}
+        ):
+            # past the list cache, rendered by the stock renderer
+            expected = JSONRenderer().render(self.client.get(url).data)
+
+        self.assertEqual(res.content, expected)
+
+    def test_post_parsed_with_orjson(self):
+        res = self.client.post(
+            reverse("recipe:recipe-list"),
+            {"title": "Soup", "time_minutes": 5, "price": "2.00", "tags": []},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, 201)
+        self.assertIsInstance(res.renderer_context["request"].parsers[0], ORJSONParser)
@@ -0,0 +1,119 @@
+"""
+Tests for the precomputed api schema
+"""
+
+import io
+import json
+import os
+import tempfile
+from unittest.mock import patch
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from rest_framework.test import APIClient
+from core import schema
+from core.schema import generate_schema, schema_cache
+
+SCHEMA_URL = reverse("api-schema")
+
+SMALL_SCHEMA = {"openapi": "3.0.3", "info": {"title": "", "version": "1"}, "paths": {}}
+
+
+class SchemaViewTests(SimpleTestCase):
+    """Tests for serving the schema"""
+
+    def setUp(self):
+        schema_cache.clear()
+        self.addCleanup(schema_cache.clear)
+        self.client = APIClient()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, "openapi.json")
+
+    def test_schema_matches_generated(self):
+        res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            res["Content-Type"], "application/vnd.oai.openapi; charset=utf-8"
+        )
+        self.assertEqual(res.content, OpenApiYamlRenderer().render(generate_schema()))
+        self.assertIn("no-cache", res["Cache-Control"])
+
+    def test_json_format(self):
+        res = self.client.get(SCHEMA_URL, {"format": "json"})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(json.loads(res.content)["openapi"], "3.0.3")
+        self.assertNotEqual(res["ETag"], self.client.get(SCHEMA_URL)["ETag"])
+
+    def test_generated_once(self):
+        with patch.object(schema, "generate_schema", wraps=generate_schema) as generate:
+            self.client.get(SCHEMA_URL)
+            self.client.get(SCHEMA_URL, {"format": "json"})
+            self.client.get(SCHEMA_URL)
+
+        generate.assert_called_once()
+
+    def test_conditional_get(self):
+        etag = self.client.get(SCHEMA_URL)["ETag"]
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.content, b"")
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=f"W/{etag}")
+        self.assertEqual(res.status_code, 304)
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(res.status_code, 200)
+
+    def test_served_from_file(self):
+        with open(self.path, "w") as schema_file:
+            json.dump(SMALL_SCHEMA, schema_file)
+
+        with override_settings(API_SCHEMA_FILE=self.path):
+            with patch.object(schema, "generate_schema") as generate:
+                res = self.client.get(SCHEMA_URL, {"format": "json"})
+
+        generate.assert_not_called()
+        self.assertEqual(json.loads(res.content), SMALL_SCHEMA)
+
+    def test_replaced_file_reloaded(self):
+        with override_settings(API_SCHEMA_FILE=self.path):
+            schema.write_schema(self.path, SMALL_SCHEMA)
+            etag = self.client.get(SCHEMA_URL)["ETag"]
+            os.utime(self.path, ns=(0, 0))
+            schema.write_schema(self.path, {**SMALL_SCHEMA, "paths": {"/x/": {}}})
+
+            res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b"/x/", res.content)
+
+    def test_missing_file_generates(self):
+        with override_settings(API_SCHEMA_FILE=self.path):
+            res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, OpenApiYamlRenderer().render(generate_schema()))
+
+
+class RefreshSchemaCommandTests(SimpleTestCase):
+    """Tests for the refresh_schema command"""
+
+    def test_writes_schema(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "schema", "openapi.json")
+            call_command("refresh_schema", file=path, stdout=io.StringIO())
+
+            with open(path, "rb") as schema_file:
+                content = schema_file.read()
+
+        self.assertEqual(content, OpenApiJsonRenderer().render(generate_schema()))
+
+    @override_settings(API_SCHEMA_FILE="")
+    def test_requires_file(self):
+        with self.assertRaises(CommandError):
+            call_command("refresh_schema", file="")
@@ -0,0 +1,122 @@
+"""
+Tests for the content addressed image storage
+"""
+
+import os
+import tempfile
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from core import models
+from core.storage import ContentAddressedStorage
+from core.views import serve_media
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Test storing and releasing files by content"""
+
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.storage = ContentAddressedStorage(location=self.media_root.name)
+
+    def tearDown(self):
+        self.media_root.cleanup()
+
+    def test_same_content_stored_once(self):
+        """Test saving identical content twice reuses one file"""
+        first = self.storage.save("uploads/recipe/a.jpg", ContentFile(b"pixels"))
+        second = self.storage.save("uploads/recipe/b.jpg", ContentFile(b"pixels"))
+
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith("uploads/recipe/"))
+        self.assertTrue(first.endswith(".jpg"))
+        self.assertEqual(models.StoredFile.objects.get(name=first).refs, 2)
+        files = os.listdir(os.path.dirname(self.storage.path(first)))
+        self.assertEqual(files, [os.path.basename(first)])
+
+    def test_different_content_stored_apart(self):
+        """Test different content gets different names"""
+        first = self.storage.save("uploads/recipe/a.jpg", ContentFile(b"pixels"))
+        second = self.storage.save("uploads/recipe/a.jpg", ContentFile(b"other"))
+
+        self.assertNotEqual(first, second)
+
+    def test_release_deletes_orphans_only(self):
+        """Test a file is deleted once its last reference is released"""
+        name = self.storage.save("uploads/recipe/a.jpg", ContentFile(b"pixels"))
+        self.storage.save("uploads/recipe/b.jpg", ContentFile(b"pixels"))
+
+        self.storage.release(name)
+        self.assertTrue(self.storage.exists(name))
+
+        self.storage.release(name)
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(models.StoredFile.objects.filter(name=name).exists())
+
+    def test_release_untracked_file_kept(self):
+        """Test files saved before deduplication are left alone"""
+        path = os.path.join(self.media_root.name, "legacy.jpg")
+        with open(path, "wb") as legacy:
+            legacy.write(b"pixels")
+
+        self.storage.release("legacy.jpg")
+
+        self.assertTrue(os.path.exists(path))
+
+
+class RecipeImageRefcountTests(TestCase):
+    """Test recipe images are shared and cleaned up"""
+
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root.name)
+        self.settings_override.enable()
+        self.user = get_user_model().objects.create_user(
+            email="example@example.com", password="shitman"
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def _recipe_with_image(self):
+        recipe = models.Recipe.objects.create(
+            user=self.user, title="Sample", time_minutes=5, price=Decimal("5.50")
+        )
+        recipe.image = SimpleUploadedFile("photo.jpg", b"same photo")
+        recipe.save()
+        return recipe
+
+    def test_deleting_shared_image(self):
+        """Test deleting a recipe keeps images other recipes still use"""
+        r1 = self._recipe_with_image()
+        r2 = self._recipe_with_image()
+        self.assertEqual(r1.image.name, r2.image.name)
+        path = r1.image.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            r1.delete()
+        self.assertTrue(os.path.exists(path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            r2.delete()
+        self.assertFalse(os.path.exists(path))
+
+
+class ServeMediaTests(TestCase):
+    """Test serving uploaded media"""
+
+    def test_immutable_cache_headers(self):
+        """Test media is served with far future cache headers"""
+        with tempfile.TemporaryDirectory() as root:
+            with open(os.path.join(root, "photo.jpg"), "wb") as photo:
+                photo.write(b"pixels")
+            request = RequestFactory().get("/static/media/photo.jpg")
+
+            res = serve_media(request, "photo.jpg", document_root=root)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("immutable", res["Cache-Control"])
+        self.assertIn("max-age=31536000", res["Cache-Control"])
@@ -0,0 +1,60 @@
+"""
+Tests for the operational views
+"""
+
+from unittest.mock import PropertyMock, patch
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+DB_POOL_URL = reverse("db-pool")
+
+
+class DatabasePoolStatsViewTests(TestCase):
+    """Test the database pool stats endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_admin_required(self):
+        """Test regular users can't read pool stats"""
+        user = get_user_model().objects.create_user(
+            email="shitman@example.com", password="shitman"
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(DB_POOL_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def _get_as_admin(self):
+        admin = get_user_model().objects.create_superuser(
+            "admin@example.com", "shitman"
+        )
+        self.client.force_authenticate(admin)
+        return self.client.get(DB_POOL_URL)
+
+    def test_pool_stats(self):
+        """Test admins get the pool's size and usage"""
+        if connections["default"].pool is None:
+            self.skipTest("DB_POOL is disabled")
+
+        res = self._get_as_admin()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data["enabled"])
+        self.assertIn("pool_size", res.data)
+        self.assertIn("pool_available", res.data)
+
+    def test_pool_disabled(self):
+        """Test the endpoint reports a disabled pool"""
+        wrapper = type(connections["default"])
+        with patch.object(wrapper, "pool", new_callable=PropertyMock) as pool:
+            pool.return_value = None
+            res = self._get_as_admin()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {"enabled": False})
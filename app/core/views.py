@@ -0,0 +1,38 @@
+"""
+Operational views for the project
+"""
+
+from django.db import connection
+from django.views.static import serve
+from drf_spectacular.utils import OpenApiResponse, OpenApiTypes, extend_schema
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from user.authentication import CachedTokenAuthentication
+
+
+class DatabasePoolStatsView(APIView):
+    """Report utilization of the database connection pool"""
+
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    @extend_schema(
+        responses=OpenApiResponse(
+            OpenApiTypes.OBJECT,
+            description="Whether the pool is enabled, and its psycopg counters if so",
+        )
+    )
+    def get(self, request):
+        pool = connection.pool
+        if pool is None:
+            return Response({"enabled": False})
+        return Response({"enabled": True, **pool.get_stats()})
+
+
+def serve_media(request, path, document_root=None):
+    """Serve uploaded media, whose names change whenever the content does"""
+    response = serve(request, path, document_root=document_root)
+    if response.status_code == 200:
+        response["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
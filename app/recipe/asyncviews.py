@@ -0,0 +1,136 @@
+"""
+Async read paths for the recipe api viewsets, served natively under ASGI
+"""
+
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.utils.decorators import classonlymethod
+from rest_framework import exceptions
+from rest_framework.response import Response
+
+
+async def afetch(queryset):
+    """Evaluate a queryset with the async ORM, prefetches included"""
+    # not aiterator(), which runs the query of values() querysets in the loop
+    return [item async for item in queryset]
+
+
+async def aauthenticate(request):
+    """Request._authenticate for async views, awaiting aauthenticate() methods"""
+    for authenticator in request.authenticators:
+        try:
+            if hasattr(authenticator, "aauthenticate"):
+                user_auth_tuple = await authenticator.aauthenticate(request)
+            else:
+                user_auth_tuple = await sync_to_async(authenticator.authenticate)(
+                    request
+                )
+        except exceptions.APIException:
+            request._not_authenticated()
+            raise
+        if user_auth_tuple is not None:
+            request._authenticator = authenticator
+            request.user, request.auth = user_auth_tuple
+            return
+    request._not_authenticated()
+
+
+class AsyncReadMixin:
+    """
+    Serve the read actions of a viewset from coroutines.
+
+    With API_ASYNC_VIEWS set, as_view() returns an async view: GET requests
+    for the async_actions are dispatched to a<action>() coroutines, which
+    query with the async ORM, and every other request runs the sync view
+    in a thread as Django would. Without it the viewset is unchanged, so
+    WSGI deployments don't pay for an event loop per request.
+
+    Throttles and permissions are still checked synchronously and must not
+    query the database.
+    """
+
+    async_actions = ("list", "retrieve")
+
+    @classonlymethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        get_action = actions.get("get")
+        if not settings.API_ASYNC_VIEWS or get_action not in cls.async_actions:
+            return view
+
+        async def async_view(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return await sync_to_async(view)(request, *args, **kwargs)
+
+            # as ViewSetMixin.as_view() binds the actions
+            self = cls(**initkwargs)
+            if "head" not in actions:
+                actions["head"] = actions["get"]
+            self.action_map = actions
+            for method, action in actions.items():
+                setattr(self, method, getattr(self, action))
+            return await self.adispatch(request, *args, **kwargs)
+
+        functools.update_wrapper(async_view, view)
+        return async_view
+
+    async def adispatch(self, request, *args, **kwargs):
+        """APIView.dispatch, awaiting authentication and the handler"""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await aauthenticate(request)
+            # authenticated already, initial() only negotiates and checks
+            self.initial(request, *args, **kwargs)
+            handler = getattr(self, f"a{self.action}")
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(
+            queryset, self.request, view=self
+        )
+
+    async def aget_object(self):
+        """get_object() with the async ORM"""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await queryset.filter(**filter_kwargs).afirst()
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        if obj is None:
+            raise Http404(
+                f"No {queryset.model._meta.object_name} matches the given query."
+            )
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(await afetch(queryset), many=True)
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
@@ -0,0 +1,176 @@
+"""
+Caching and conditional GET support for the recipe api list endpoints
+"""
+
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Subquery
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date, parse_http_date
+from rest_framework.response import Response
+from core.models import Tombstone
+
+
+def list_stats(user):
+    """Return the aggregates the list validators are derived from"""
+    # deleted rows leave no updated_at behind, the user's latest tombstone
+    # moves the validators on; uncorrelated, so it runs once per aggregate
+    deleted = Tombstone.objects.filter(user=user).order_by("-deleted_at")
+    return {
+        "last_modified": Max("updated_at"),
+        "count": Count("id"),
+        "deleted_at": Max(Subquery(deleted.values("deleted_at")[:1])),
+    }
+
+
+def _version_key(user_id):
+    return f"recipe:version:{user_id}"
+
+
+def get_version(user_id):
+    """Return the current cache version for a user's recipe data"""
+    return cache.get_or_set(_version_key(user_id), 1, timeout=None)
+
+
+async def aget_version(user_id):
+    return await cache.aget_or_set(_version_key(user_id), 1, timeout=None)
+
+
+def bump_version(user_id):
+    """Invalidate every cached list response for a user"""
+    key = _version_key(user_id)
+    cache.add(key, 1, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # the key was evicted between add() and incr()
+        cache.set(key, 2, timeout=None)
+
+
+def _list_cache_key(request, prefix, version):
+    query = sorted(request.query_params.lists())
+    digest = hashlib.md5(repr(query).encode(), usedforsecurity=False).hexdigest()
+    return f"recipe:list:{prefix}:{request.user.id}:{version}:{digest}"
+
+
+def list_cache_key(request, prefix):
+    """Build the cache key for a list request of the given endpoint"""
+    return _list_cache_key(request, prefix, get_version(request.user.id))
+
+
+async def alist_cache_key(request, prefix):
+    return _list_cache_key(request, prefix, await aget_version(request.user.id))
+
+
+def _not_modified(request, validators):
+    """Return a 304 response if the client's copy matches the validators"""
+    etag, last_modified = validators
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None and etag is not None:
+        response["ETag"] = etag
+    return response
+
+
+def _get_validators(response):
+    last_modified = response.get("Last-Modified")
+    return response.get("ETag"), last_modified and parse_http_date(last_modified)
+
+
+def _set_validators(response, validators):
+    etag, last_modified = validators
+    if etag is not None:
+        response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+class ConditionalListMixin:
+    """Answer conditional list requests with a 304 before serializing"""
+
+    def _validators(self, stats):
+        changes = [stats["last_modified"], stats["deleted_at"]]
+        last_modified = max(filter(None, changes), default=None)
+        tag = f"{last_modified and last_modified.isoformat()}:{stats['count']}"
+        etag = quote_etag(hashlib.md5(tag.encode(), usedforsecurity=False).hexdigest())
+        return etag, last_modified and timegm(last_modified.utctimetuple())
+
+    def get_list_validators(self):
+        """Return an (etag, last modified timestamp) pair for the list"""
+        queryset = self.filter_queryset(self.get_queryset())
+        return self._validators(queryset.aggregate(**list_stats(self.request.user)))
+
+    async def aget_list_validators(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        stats = list_stats(self.request.user)
+        return self._validators(await queryset.aaggregate(**stats))
+
+    def list(self, request, *args, **kwargs):
+        validators = self.get_list_validators()
+        response = _not_modified(request, validators)
+        if response is not None:
+            return response
+
+        response = super().list(request, *args, **kwargs)
+        return _set_validators(response, validators)
+
+    async def alist(self, request, *args, **kwargs):
+        validators = await self.aget_list_validators()
+        response = _not_modified(request, validators)
+        if response is not None:
+            return response
+
+        response = await super().alist(request, *args, **kwargs)
+        return _set_validators(response, validators)
+
+
+class CachedListMixin:
+    """
+    Serve list responses from the cache until the user's data changes.
+
+    Only used with RECIPE_LIST_CACHE, as a write can't invalidate the lists
+    other processes hold in a per-process cache.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not settings.RECIPE_LIST_CACHE:
+            return super().list(request, *args, **kwargs)
+        key = list_cache_key(request, self.basename)
+        cached = cache.get(key)
+        if cached is not None:
+            data, validators = cached
+            response = _not_modified(request, validators)
+            if response is not None:
+                return response
+            return _set_validators(Response(data), validators)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cached = (response.data, _get_validators(response))
+            cache.set(key, cached, settings.RECIPE_LIST_CACHE_TIMEOUT)
+        return response
+
+    async def alist(self, request, *args, **kwargs):
+        if not settings.RECIPE_LIST_CACHE:
+            return await super().alist(request, *args, **kwargs)
+        key = await alist_cache_key(request, self.basename)
+        cached = await cache.aget(key)
+        if cached is not None:
+            data, validators = cached
+            response = _not_modified(request, validators)
+            if response is not None:
+                return response
+            return _set_validators(Response(data), validators)
+
+        response = await super().alist(request, *args, **kwargs)
+        if response.status_code == 200:
+            cached = (response.data, _get_validators(response))
+            await cache.aset(key, cached, settings.RECIPE_LIST_CACHE_TIMEOUT)
+        return response
+
+    def invalidate_list_cache(self):
+        if settings.RECIPE_LIST_CACHE:
+            bump_version(self.request.user.id)
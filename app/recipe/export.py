@@ -0,0 +1,83 @@
+"""
+Streaming exports of a user's recipes
+"""
+
+import csv
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from .serializers import RecipeDetailSerializer
+
+# recipes fetched, and their tags and ingredients prefetched, per round trip
+EXPORT_CHUNK_SIZE = 500
+
+CSV_FIELDS = [
+    "id",
+    "title",
+    "description",
+    "time_minutes",
+    "price",
+    "link",
+    "image",
+    "tags",
+    "ingredients",
+]
+
+# spreadsheets run cells starting with these as formulas
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _serialized(recipes, context):
+    for recipe in recipes.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield RecipeDetailSerializer(recipe, context=context).data
+
+
+def export_ndjson(recipes, context):
+    """Yield recipes as newline delimited JSON, one object per line"""
+    encoder = JSONEncoder()
+    for data in _serialized(recipes, context):
+        yield encoder.encode(data) + "\n"
+
+
+def _csv_cell(value):
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+class _Echo:
+    """File-like object handing csv.writer output straight back"""
+
+    def write(self, value):
+        return value
+
+
+def export_csv(recipes, context):
+    """Yield recipes as CSV rows, tag and ingredient names joined by '|'"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_FIELDS)
+    for data in _serialized(recipes, context):
+        row = {**data}
+        for relation in ["tags", "ingredients"]:
+            row[relation] = "|".join(item["name"] for item in data[relation])
+        yield writer.writerow([_csv_cell(row[field]) for field in CSV_FIELDS])
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Lets clients ask for the NDJSON export with an Accept header"""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+
+class CSVRenderer(BaseRenderer):
+    """Lets clients ask for the CSV export with an Accept header"""
+
+    media_type = "text/csv"
+    format = "csv"
+
+
+EXPORTERS = {
+    "ndjson": (export_ndjson, "application/x-ndjson"),
+    "csv": (export_csv, "text/csv"),
+}
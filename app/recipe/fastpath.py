@@ -0,0 +1,204 @@
+"""
+Read only list serialization straight from .values() rows
+"""
+
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+from .asyncviews import afetch
+
+# fields whose to_representation returns database values unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.ReadOnlyField,
+)
+CONVERTED_FIELDS = (
+    serializers.BooleanField,
+    serializers.DateTimeField,
+    serializers.DecimalField,
+    serializers.FloatField,
+    serializers.IntegerField,
+)
+
+
+class Unsupported(Exception):
+    """The serializer has a field the fast path can't render"""
+
+
+def _convert(field):
+    """Return the function rendering a column value, None when unchanged"""
+    if type(field) in PASSTHROUGH_FIELDS:
+        return None
+    if isinstance(field, serializers.IntegerField) and not getattr(
+        field, "coerce_to_string", False
+    ):
+        # int(value) of an int column, BigIntegerField may render strings
+        return None
+    if isinstance(field, CONVERTED_FIELDS):
+        return field.to_representation
+    raise Unsupported(field.field_name)
+
+
+class RowSerializer:
+    """
+    Render rows as ModelSerializer(many=True).data would, without building
+    model instances or binding a serializer per row.
+
+    Plain fields must map to columns of the model. Many to many relations
+    nested with a serializer of plain fields, or rendered as primary keys,
+    are read from the through table in one query each.
+    """
+
+    def __init__(self, serializer):
+        model = serializer.Meta.model
+        concrete = {field.name for field in model._meta.concrete_fields}
+        self.columns = ["id"]
+        # (output name, column or relation, converter or nested fields)
+        self.fields = []
+        for name, field in serializer.fields.items():
+            if isinstance(field, serializers.ListSerializer):
+                child = field.child
+                nested = [
+                    (key, sub.source, _convert(sub))
+                    for key, sub in child.fields.items()
+                ]
+                self.fields.append((name, self._links(model, field.source), nested))
+            elif isinstance(field, ManyRelatedField):
+                if type(field.child_relation) is not PrimaryKeyRelatedField:
+                    raise Unsupported(name)
+                self.fields.append((name, self._links(model, field.source), None))
+            elif field.source in concrete:
+                self.fields.append((name, field.source, _convert(field)))
+                self.columns.append(field.source)
+            else:
+                raise Unsupported(name)
+
+    @classmethod
+    def for_serializer(cls, serializer):
+        """Return a row serializer mirroring serializer, or None if it can't"""
+        try:
+            return cls(serializer)
+        except Unsupported:
+            return None
+
+    def _links(self, model, relation):
+        field = model._meta.get_field(relation)
+        if not field.many_to_many or not field.concrete:
+            raise Unsupported(relation)
+        return (
+            field.remote_field.through,
+            f"{field.m2m_field_name()}_id",
+            field.m2m_reverse_field_name(),
+        )
+
+    def _relation_rows(self, links, nested, ids):
+        """Query the (parent id, related columns...) rows of a relation"""
+        through, parent, target = links
+        rows = through.objects.filter(**{f"{parent}__in": ids}).order_by(f"{target}_id")
+        if nested is None:
+            return rows.values_list(parent, f"{target}_id")
+        lookups = [f"{target}__{source}" for _key, source, _conv in nested]
+        return rows.values_list(parent, *lookups)
+
+    def _relation_map(self, nested, rows):
+        """Map each parent id to its rendered related objects, by related id"""
+        related = {}
+        if nested is None:
+            for parent_id, target_id in rows:
+                related.setdefault(parent_id, []).append(target_id)
+            return related
+
+        for parent_id, *columns in rows:
+            item = {}
+            for (key, _source, convert), value in zip(nested, columns):
+                item[key] = (
+                    value if convert is None or value is None else convert(value)
+                )
+            related.setdefault(parent_id, []).append(item)
+        return related
+
+    def related(self, ids):
+        """Fetch the rendered relations of the given ids, one query each"""
+        return {
+            name: (
+                self._relation_map(nested, self._relation_rows(links, nested, ids))
+                if ids
+                else {}
+            )
+            for name, links, nested in self.fields
+            if isinstance(links, tuple)
+        }
+
+    async def arelated(self, ids):
+        related = {}
+        for name, links, nested in self.fields:
+            if isinstance(links, tuple):
+                rows = (
+                    await afetch(self._relation_rows(links, nested, ids)) if ids else []
+                )
+                related[name] = self._relation_map(nested, rows)
+        return related
+
+    def build(self, rows, related):
+        """Return the output dicts for the rows and their fetched relations"""
+        data = []
+        for row in rows:
+            item = {}
+            for name, source, convert in self.fields:
+                if name in related:
+                    item[name] = related[name].get(row["id"], [])
+                    continue
+                value = row[source]
+                item[name] = (
+                    value if convert is None or value is None else convert(value)
+                )
+            data.append(item)
+        return data
+
+    def render(self, rows):
+        """Return the list of output dicts for the rows"""
+        rows = list(rows)
+        return self.build(rows, self.related([row["id"] for row in rows]))
+
+    async def arender(self, rows):
+        """render() for a list of rows, querying with the async ORM"""
+        return self.build(rows, await self.arelated([row["id"] for row in rows]))
+
+
+class FastListMixin:
+    """Serialize list responses from .values() rows when the serializer allows"""
+
+    def _row_keys(self, queryset):
+        """Columns and annotations the ordering, and so the cursor, reads"""
+        names = {field.name for field in queryset.model._meta.concrete_fields}
+        names |= set(queryset.query.annotation_select)
+        keys = [key.lstrip("-") for key in queryset.query.order_by]
+        return [key for key in keys if key in names]
+
+    def _rows(self, fast):
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = dict.fromkeys([*fast.columns, *self._row_keys(queryset)])
+        return queryset.prefetch_related(None).values(*columns)
+
+    def list(self, request, *args, **kwargs):
+        fast = RowSerializer.for_serializer(self.get_serializer())
+        if fast is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = self._rows(fast)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(fast.render(page))
+        return Response(fast.render(rows))
+
+    async def alist(self, request, *args, **kwargs):
+        fast = RowSerializer.for_serializer(self.get_serializer())
+        if fast is None:
+            return await super().alist(request, *args, **kwargs)
+
+        rows = self._rows(fast)
+        page = await self.apaginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(await fast.arender(page))
+        return Response(await fast.arender(await afetch(rows)))
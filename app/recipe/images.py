@@ -0,0 +1,127 @@
+"""
+Background generation of resized recipe image renditions
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+from core.models import Recipe
+from core.storage import recipe_image_storage, release_recipe_image
+
+logger = logging.getLogger(__name__)
+
+# name: (longest edge in px, format, quality)
+RENDITIONS = {
+    "thumbnail": (320, "JPEG", 75),
+    "medium": (960, "WEBP", 80),
+    "large": (1920, "WEBP", 85),
+}
+
+# source format: format and options the original is re-encoded with
+ORIGINAL_FORMATS = {
+    "JPEG": ("JPEG", {"quality": 95}),
+    "MPO": ("JPEG", {"quality": 95}),
+    "PNG": ("PNG", {"optimize": True}),
+    "WEBP": ("WEBP", {"quality": 95}),
+    "TIFF": ("TIFF", {}),
+}
+
+_executor = None
+
+
+def get_executor():
+    """Return the shared worker pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.RECIPE_IMAGE_WORKERS,
+            thread_name_prefix="recipe-image",
+        )
+    return _executor
+
+
+def _render(image, size, fmt, quality):
+    image = image.copy()
+    image.thumbnail((size, size))
+    if fmt == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    buffer = BytesIO()
+    # no exif= or icc_profile= is passed, so metadata is dropped
+    image.save(buffer, fmt, quality=quality, optimize=True)
+    return ContentFile(buffer.getvalue())
+
+
+def strip_metadata(upload):
+    """Re-encode an uploaded original without its EXIF and XMP metadata"""
+    upload.seek(0)
+    with Image.open(upload) as image:
+        if image.format not in ORIGINAL_FORMATS:
+            # GIF and BMP carry no EXIF, re-encoding would drop animations
+            upload.seek(0)
+            return upload
+        fmt, options = ORIGINAL_FORMATS[image.format]
+        icc_profile = image.info.get("icc_profile")
+        # bake the orientation into the pixels, as for the renditions
+        image = ImageOps.exif_transpose(image)
+        buffer = BytesIO()
+        image.save(buffer, fmt, icc_profile=icc_profile, **options)
+    return ContentFile(buffer.getvalue(), name=upload.name)
+
+
+def generate_renditions(recipe_id, name):
+    """Resize and re-encode an uploaded original and record the results"""
+    files = {}
+    directory = os.path.dirname(name)
+    with recipe_image_storage.open(name) as original, Image.open(original) as image:
+        # bake the EXIF orientation into the pixels before it is stripped
+        image = ImageOps.exif_transpose(image)
+        for rendition, (size, fmt, quality) in RENDITIONS.items():
+            files[rendition] = (
+                os.path.join(directory, f"{rendition}.{fmt.lower()}"),
+                _render(image, size, fmt, quality),
+            )
+
+    # the references roll back with the update if it fails
+    with transaction.atomic():
+        renditions = {
+            rendition: recipe_image_storage.save(path, content)
+            for rendition, (path, content) in files.items()
+        }
+        updated = Recipe.objects.filter(pk=recipe_id, image=name).update(
+            image_renditions=renditions, updated_at=timezone.now()
+        )
+        if not updated:
+            # the image was replaced or the recipe deleted while we were working
+            release_recipe_image(None, renditions)
+    return renditions
+
+
+def _run(recipe_id, name, in_worker=True):
+    # the upload is committed already, a failure must not fail the request
+    try:
+        generate_renditions(recipe_id, name)
+    except Exception:
+        logger.exception("Generating renditions of %s failed", name)
+    finally:
+        if in_worker:
+            connection.close()
+
+
+def enqueue_renditions(recipe):
+    """Generate renditions of a recipe's image once the upload is committed"""
+    if not settings.RECIPE_IMAGE_WORKERS:
+        transaction.on_commit(
+            partial(_run, recipe.pk, recipe.image.name, in_worker=False)
+        )
+        return
+    transaction.on_commit(
+        partial(get_executor().submit, _run, recipe.pk, recipe.image.name)
+    )
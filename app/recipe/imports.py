@@ -0,0 +1,80 @@
+"""
+Bulk import of recipes
+"""
+
+from django.db import transaction
+from core.models import Recipe, Tag, Ingredient
+from .serializers import RecipeDetailSerializer, get_or_create_named
+
+# recipes inserted per transaction
+IMPORT_BATCH_SIZE = 500
+
+RELATIONS = [("tags", Tag), ("ingredients", Ingredient)]
+
+
+def _link(relation, recipes, names, objs):
+    """Insert the through rows linking each recipe to its named objects"""
+    field = Recipe._meta.get_field(relation)
+    through = field.remote_field.through
+    target_id = f"{field.m2m_reverse_field_name()}_id"
+    through.objects.bulk_create(
+        [
+            through(recipe_id=recipe.id, **{target_id: objs[name].id})
+            for recipe, recipe_names in zip(recipes, names)
+            for name in recipe_names
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _names(items):
+    return list(dict.fromkeys(item["name"] for item in items))
+
+
+def _recipe_fields(data):
+    return {
+        key: value for key, value in data.items() if key not in ("tags", "ingredients")
+    }
+
+
+def import_recipes(rows, context):
+    """
+    Validate and create recipes in batches.
+
+    Invalid rows are skipped and reported as {"row": index, "errors": ...}.
+    Returns the ids of the created recipes, in row order, and the errors.
+    """
+    user = context["request"].user
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        serializer = RecipeDetailSerializer(data=row, context=context)
+        if serializer.is_valid():
+            valid.append(serializer.validated_data)
+        else:
+            errors.append({"row": index, "errors": serializer.errors})
+
+    ids = []
+    if not valid:
+        return ids, errors
+
+    # resolve every name of the whole import with one lookup per model
+    objs = {}
+    with transaction.atomic():
+        for relation, model in RELATIONS:
+            names = [name for data in valid for name in _names(data.get(relation, []))]
+            objs[relation] = get_or_create_named(
+                model, user, list(dict.fromkeys(names))
+            )
+
+    for start in range(0, len(valid), IMPORT_BATCH_SIZE):
+        end = start + IMPORT_BATCH_SIZE
+        batch = valid[start:end]
+        with transaction.atomic():
+            recipes = Recipe.objects.bulk_create(
+                [Recipe(user=user, **_recipe_fields(data)) for data in batch]
+            )
+            for relation, _model in RELATIONS:
+                names = [_names(data.get(relation, [])) for data in batch]
+                _link(relation, recipes, names, objs[relation])
+        ids.extend(recipe.id for recipe in recipes)
+    return ids, errors
@@ -0,0 +1,131 @@
+"""
+Django command comparing list serialization with and without the fast path
+"""
+
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from core.models import Recipe, Tag, Ingredient
+from recipe.fastpath import RowSerializer
+from recipe.serializers import RecipeSerializer
+
+
+class Rollback(Exception):
+    """Raised to discard the sample data"""
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    """Time RecipeSerializer(many=True) against RowSerializer on sample data"""
+
+    help = "Benchmark recipe list serialization, sample data is rolled back"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options["rows"], options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _create(self, rows):
+        user = get_user_model().objects.create_user(email="benchmark@example.com")
+        tags = Tag.objects.bulk_create(
+            [Tag(user=user, name=f"Tag {i}") for i in range(20)]
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            [Ingredient(user=user, name=f"Ingredient {i}") for i in range(50)]
+        )
+        recipes = Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    user=user,
+                    title=f"Recipe {i}",
+                    time_minutes=i % 90,
+                    price=Decimal(i % 100) / 4,
+                    link="https://example.com",
+                )
+                for i in range(rows)
+            ]
+        )
+        Recipe.tags.through.objects.bulk_create(
+            [
+                Recipe.tags.through(recipe=recipe, tag=tags[(i + j) % len(tags)])
+                for i, recipe in enumerate(recipes)
+                for j in range(3)
+            ]
+        )
+        Recipe.ingredients.through.objects.bulk_create(
+            [
+                Recipe.ingredients.through(
+                    recipe=recipe, ingredient=ingredients[(i + j) % len(ingredients)]
+                )
+                for i, recipe in enumerate(recipes)
+                for j in range(5)
+            ]
+        )
+        return Recipe.objects.filter(user=user).order_by("-id")
+
+    def _run(self, rows, repeat):
+        queryset = self._create(rows)
+        prefetched = queryset.prefetch_related(
+            Prefetch("tags", queryset=Tag.objects.only("id", "name").order_by("id")),
+            Prefetch(
+                "ingredients",
+                queryset=Ingredient.objects.only("id", "name").order_by("id"),
+            ),
+        )
+        fast = RowSerializer(RecipeSerializer())
+
+        def serializer_path():
+            return RecipeSerializer(list(prefetched), many=True).data
+
+        def fast_path():
+            return fast.render(queryset.values(*fast.columns))
+
+        if serializer_path() != fast_path():
+            self.stderr.write(self.style.ERROR("Outputs differ"))
+            return
+
+        # the same work without the queries
+        instances = list(prefetched)
+        rows = list(queryset.values(*fast.columns))
+        related = fast.related([row["id"] for row in rows])
+
+        results = [
+            (
+                "end to end",
+                best_of(repeat, serializer_path),
+                best_of(repeat, fast_path),
+            ),
+            (
+                "serialization only",
+                best_of(repeat, lambda: RecipeSerializer(instances, many=True).data),
+                best_of(repeat, lambda: fast.build(rows, related)),
+            ),
+        ]
+        self.stdout.write(f"{len(rows)} recipes, best of {repeat}")
+        self.stdout.write(
+            f"{'':<20}{'RecipeSerializer':>18}{'RowSerializer':>16}{'speedup':>10}"
+        )
+        for label, slow, quick in results:
+            self.stdout.write(
+                f"{label:<20}{slow * 1000:>15.1f} ms{quick * 1000:>13.1f} ms"
+                f"{slow / quick:>9.1f}x"
+            )
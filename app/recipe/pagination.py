@@ -0,0 +1,118 @@
+"""
+Pagination for the recipe api
+"""
+
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+from .asyncviews import afetch
+
+
+class BaseCursorPagination(CursorPagination):
+    """Keyset pagination with a client selectable, bounded page size"""
+
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+    # CursorPagination.paginate_queryset split around its one query, so
+    # async views can await it
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """Return the query of the page and the item after it, or None"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            order = self.ordering[0]
+            is_reversed = order.startswith("-")
+            order_attr = order.lstrip("-")
+            if self.cursor.reverse != is_reversed:
+                queryset = queryset.filter(**{f"{order_attr}__lt": current_position})
+            else:
+                queryset = queryset.filter(**{f"{order_attr}__gt": current_position})
+
+        self._offset, self._reverse = offset, reverse
+        self._current_position = current_position
+        # one more than the page, to know if a page follows
+        end = offset + self.page_size + 1
+        return queryset[offset:end]
+
+    def set_page(self, results):
+        """Keep the page out of the fetched results and locate its neighbours"""
+        offset, reverse = self._offset, self._reverse
+        current_position = self._current_position
+        self.page = results[: self.page_size]
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(await afetch(queryset))
+
+
+class RecipeCursorPagination(BaseCursorPagination):
+    """Paginate recipes newest first, or by rank for searches"""
+
+    ordering = ("-id",)
+
+    def get_ordering(self, request, queryset, view):
+        if "rank" in queryset.query.annotations:
+            return ("-rank", "-id")
+        return super().get_ordering(request, queryset, view)
+
+
+class RecipeAttrCursorPagination(BaseCursorPagination):
+    """Paginate tags and ingredients by name"""
+
+    ordering = ("-name", "-id")
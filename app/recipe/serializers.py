@@ -1,10 +1,60 @@
 """ "Serializers for recipe api's"""
 
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext as _
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 from core.models import Recipe, Tag, Ingredient
+from core.storage import recipe_image_storage
+from .images import strip_metadata
 
 
-class TagSerializer(serializers.ModelSerializer):
+def get_or_create_named(model, user, names):
+    """Map each name to the user's object of that name, creating missing ones"""
+    if not names:
+        return {}
+
+    objs = {obj.name: obj for obj in model.objects.filter(user=user, name__in=names)}
+    missing = [model(user=user, name=name) for name in names if name not in objs]
+    if missing:
+        # a concurrent request may have created some of the names already
+        created = model.objects.bulk_create(
+            missing,
+            update_conflicts=True,
+            unique_fields=["user", "name"],
+            update_fields=["name"],
+        )
+        objs.update({obj.name: obj for obj in created})
+    return objs
+
+
+class SparseFieldsMixin:
+    """
+    Keep only the fields named in the context, when it names any.
+
+    Relations listed in Meta.expandable_fields are rendered as ids unless
+    they are in the context's expand set too.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get("fields")
+        if not fields:
+            return
+
+        expandable = getattr(self.Meta, "expandable_fields", [])
+        expand = self.context.get("expand", set())
+        for name in list(self.fields):
+            if name not in fields:
+                self.fields.pop(name)
+            elif name in expandable and name not in expand:
+                self.fields[name] = serializers.PrimaryKeyRelatedField(
+                    many=True, read_only=True
+                )
+
+
+class TagSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for tags"""
 
     class Meta:
@@ -13,7 +63,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for the Ingredient model"""
 
     class Meta:
@@ -22,7 +72,7 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for recipe"""
 
     tags = TagSerializer(many=True, required=False)
@@ -32,64 +82,176 @@ class RecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ["id", "title", "time_minutes", "price", "link", "tags", "ingredients"]
         read_only_fields = ["id"]
+        expandable_fields = ["tags", "ingredients"]
+
+    def _get_or_create_attrs(self, model, items):
+        """Return the user's objects for the given names, creating missing ones"""
+        user = self.context["request"].user
+        names = list(dict.fromkeys(item["name"] for item in items))
+        objs = get_or_create_named(model, user, names)
+        return [objs[name] for name in names]
+
+    def _add_attrs(self, relation, objs, recipe):
+        """Link objects to a recipe with a single through table insert"""
+        field = Recipe._meta.get_field(relation)
+        through = field.remote_field.through
+        target = field.m2m_reverse_field_name()
+        through.objects.bulk_create(
+            [through(recipe=recipe, **{target: obj}) for obj in objs],
+            ignore_conflicts=True,
+        )
+
+    def _set_attrs(self, relation, objs, recipe):
+        """Sync a recipe's links to objs, writing only the changed through rows"""
+        field = Recipe._meta.get_field(relation)
+        through = field.remote_field.through
+        target_id = f"{field.m2m_reverse_field_name()}_id"
+        links = through.objects.filter(recipe=recipe)
+        current = set(links.values_list(target_id, flat=True))
+        wanted = {obj.id for obj in objs}
+
+        removed = current - wanted
+        if removed:
+            links.filter(**{f"{target_id}__in": removed}).delete()
+        self._add_attrs(
+            relation, [obj for obj in objs if obj.id not in current], recipe
+        )
+        return bool(removed or wanted - current)
 
     def _get_or_create_tags(self, tags, recipe):
         """Handle getting or creating tags"""
-        user = self.context["request"].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(user=user, **tag)
-            recipe.tags.add(tag_obj)
+        objs = self._get_or_create_attrs(Tag, tags)
+        self._add_attrs("tags", objs, recipe)
         return recipe
 
     def _get_or_create_ingredients(self, ingredients, recipe):
-        user = self.context["request"].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=user, **ingredient
-            )
-            recipe.ingredients.add(ingredient_obj)
+        objs = self._get_or_create_attrs(Ingredient, ingredients)
+        self._add_attrs("ingredients", objs, recipe)
         return recipe
 
     def create(self, validated_data):
         """Create a recipe"""
         tags = validated_data.pop("tags", [])
         ingredients = validated_data.pop("ingredients", [])
-        recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients=ingredients, recipe=recipe)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(**validated_data)
+            self._get_or_create_tags(tags, recipe)
+            self._get_or_create_ingredients(ingredients=ingredients, recipe=recipe)
         return recipe
 
     def update(self, instance, validated_data):
         """Update recipe"""
         tags = validated_data.pop("tags", None)
         ingredients = validated_data.pop("ingredients", None)
-        if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+        links_changed = False
+        with transaction.atomic():
+            if tags is not None:
+                objs = self._get_or_create_attrs(Tag, tags)
+                links_changed |= self._set_attrs("tags", objs, instance)
 
-        if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+            if ingredients is not None:
+                objs = self._get_or_create_attrs(Ingredient, ingredients)
+                links_changed |= self._set_attrs("ingredients", objs, instance)
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
 
-        instance.save()
+            if validated_data or links_changed:
+                instance.save(update_fields=[*validated_data, "updated_at"])
+        # the links were written behind the related managers' backs
+        instance._prefetched_objects_cache = {}
         return instance
 
 
+@extend_schema_field(
+    {
+        "type": "object",
+        "additionalProperties": {"type": "string", "format": "uri"},
+        "nullable": True,
+    }
+)
+class RenditionsField(serializers.Field):
+    """Read only map of image rendition names to URLs, null while processing"""
+
+    def __init__(self, **kwargs):
+        kwargs["source"] = "image_renditions"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, renditions):
+        if not renditions:
+            return None
+        request = self.context.get("request")
+        urls = {}
+        for name, path in renditions.items():
+            url = recipe_image_storage.url(path)
+            urls[name] = request.build_absolute_uri(url) if request else url
+        return urls
+
+
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer for recipe detail view"""
 
+    renditions = RenditionsField()
+
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ["description", "image"]
+        fields = RecipeSerializer.Meta.fields + ["description", "image", "renditions"]
+        # images are replaced through the upload endpoint only
+        read_only_fields = RecipeSerializer.Meta.read_only_fields + ["image"]
 
 
 # it's best practive to have one api for each form of data being sent
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
 
+    renditions = RenditionsField()
+
     class Meta:
         model = Recipe
-        fields = ["id", "image"]
+        fields = ["id", "image", "renditions"]
         read_only_fields = ["id"]
         extra_kwargs = {"image": {"required": "True"}}
+
+    def validate_image(self, value):
+        # the original is public, GPS and camera details must not leak
+        return strip_metadata(value)
+
+
+class RecipeBulkSelectionSerializer(serializers.Serializer):
+    """Recipes targeted by a bulk action, the list filters apply without ids"""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.API_MAX_PAGE_SIZE,
+        required=False,
+    )
+
+
+class RecipeBulkChangesSerializer(serializers.ModelSerializer):
+    """Field values written to every recipe of a bulk update"""
+
+    class Meta:
+        model = Recipe
+        fields = ["title", "time_minutes", "price", "link", "description"]
+        extra_kwargs = {field: {"required": False} for field in fields}
+
+
+class RecipeBulkUpdateSerializer(RecipeBulkSelectionSerializer):
+    """Serializer for bulk updating recipes"""
+
+    changes = RecipeBulkChangesSerializer(required=False)
+    add_tags = TagSerializer(many=True, required=False)
+    remove_tags = TagSerializer(many=True, required=False)
+    add_ingredients = IngredientSerializer(many=True, required=False)
+    remove_ingredients = IngredientSerializer(many=True, required=False)
+
+    def validate(self, attrs):
+        if not any(value for key, value in attrs.items() if key != "ids"):
+            raise serializers.ValidationError(_("No changes were given."))
+        return attrs
+
+
+class RecipeBulkResultSerializer(serializers.Serializer):
+    """Outcome of a bulk action for each requested recipe"""
+
+    results = serializers.ListField(child=serializers.DictField())
@@ -0,0 +1,58 @@
+"""
+Sparse fieldsets for the recipe api read endpoints
+"""
+
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
+
+SPARSE_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        OpenApiTypes.STR,
+        description="Comma separated list of the fields to return, all by default",
+    ),
+    OpenApiParameter(
+        "expand",
+        OpenApiTypes.STR,
+        description=(
+            "Comma separated list of relations in fields to nest as objects, "
+            "the others are returned as ids"
+        ),
+    ),
+]
+
+
+class SparseQuerysetMixin:
+    """Load the fields asked for and pass fields and expand to the serializer"""
+
+    sparse_actions = ("list", "retrieve")
+    # serializer field name -> model field, where they differ
+    field_sources = {}
+
+    def _param_set(self, name):
+        value = self.request.query_params.get(name, "")
+        return {part.strip() for part in value.split(",") if part.strip()}
+
+    def requested_fields(self):
+        """Return the names of the fields asked for, None for all of them"""
+        if self.action not in self.sparse_actions:
+            return None
+        return self._param_set("fields") or None
+
+    def requested_expansions(self):
+        return self._param_set("expand")
+
+    def only_requested(self, queryset, *always):
+        """Load only the columns backing the requested fields"""
+        fields = self.requested_fields()
+        if not fields:
+            return queryset
+        concrete = {field.name for field in queryset.model._meta.concrete_fields}
+        sources = {self.field_sources.get(name, name) for name in fields}
+        return queryset.only("id", *always, *sorted(sources & concrete))
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields = self.requested_fields()
+        if fields:
+            context.update(fields=fields, expand=self.requested_expansions())
+        return context
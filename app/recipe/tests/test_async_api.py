@@ -0,0 +1,186 @@
+"""
+Tests for the async read paths of the recipe api
+"""
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+from core.models import Recipe, Tag, Ingredient
+from recipe.views import IngredientViewSet, RecipeViewSet, TagViewSet
+from user.authentication import local_tokens
+
+
+def build_views(viewset, actions):
+    """Return the sync and async views of a viewset route"""
+    with override_settings(API_ASYNC_VIEWS=False):
+        sync_view = viewset.as_view(dict(actions))
+    with override_settings(API_ASYNC_VIEWS=True):
+        async_view = viewset.as_view(dict(actions))
+    return sync_view, async_to_sync(async_view)
+
+
+class AsyncReadTests(TestCase):
+    """Test the async views answer as the sync ones do"""
+
+    def setUp(self):
+        cache.clear()
+        local_tokens.clear()
+        self.addCleanup(local_tokens.clear)
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.factory = APIRequestFactory()
+        tags = [Tag.objects.create(user=self.user, name=name) for name in "CAB"]
+        salt = Ingredient.objects.create(user=self.user, name="Salt")
+        for index in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f"Soup {index}",
+                time_minutes=5,
+                price="5.50",
+            )
+            recipe.tags.add(*tags[: index % 4])
+            recipe.ingredients.add(salt)
+        self.recipe = recipe
+
+    def get(self, view, path="/", token=None, **kwargs):
+        token = self.token.key if token is None else token
+        request = self.factory.get(
+            path,
+            kwargs.pop("data", None),
+            HTTP_AUTHORIZATION=f"Token {token}",
+            **kwargs,
+        )
+        response = view(request, **kwargs.pop("route", {}))
+        return response.render() if hasattr(response, "render") else response
+
+    def assertSame(self, views, path="/", **kwargs):
+        sync_view, async_view = views
+        cache.clear()
+        expected = self.get(sync_view, path, **kwargs)
+        cache.clear()
+        actual = self.get(async_view, path, **kwargs)
+
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.content, expected.content)
+        return actual
+
+    def test_views_async_only_when_enabled(self):
+        sync_view, _ = build_views(RecipeViewSet, {"get": "list", "post": "create"})
+        self.assertFalse(iscoroutinefunction(sync_view))
+
+        with override_settings(API_ASYNC_VIEWS=True):
+            view = RecipeViewSet.as_view({"get": "list", "post": "create"})
+        self.assertTrue(iscoroutinefunction(view))
+        self.assertTrue(view.csrf_exempt)
+
+    def test_recipe_list(self):
+        views = build_views(RecipeViewSet, {"get": "list"})
+
+        res = self.assertSame(views)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data["results"]), 5)
+        self.assertSame(views, data={"page_size": 2})
+        self.assertSame(views, data={"fields": "id,tags", "expand": "tags"})
+        self.assertSame(views, data={"search": "soup"})
+
+        first = self.get(views[1], data={"page_size": 2})
+        second = self.assertSame(views, first.data["next"])
+        self.assertEqual(len(second.data["results"]), 2)
+        self.assertIsNotNone(second.data["previous"])
+
+    def test_recipe_list_slow_path(self):
+        views = build_views(RecipeViewSet, {"get": "list"})
+        res = self.assertSame(views, data={"fields": "id,renditions"})
+        self.assertEqual(len(res.data["results"]), 5)
+
+    def test_recipe_retrieve(self):
+        views = build_views(RecipeViewSet, {"get": "retrieve"})
+
+        res = self.assertSame(views, route={"pk": self.recipe.id})
+        self.assertEqual(res.data["id"], self.recipe.id)
+        self.assertEqual(len(res.data["tags"]), 0)
+
+    def test_retrieve_not_found(self):
+        other = get_user_model().objects.create_user(
+            email="other@example.com", password="testpass123"
+        )
+        recipe = Recipe.objects.create(
+            user=other, title="Other", time_minutes=1, price="1.00"
+        )
+        views = build_views(RecipeViewSet, {"get": "retrieve"})
+
+        for pk in [recipe.id, "abc"]:
+            with self.subTest(pk=pk):
+                res = self.assertSame(views, route={"pk": pk})
+                self.assertEqual(res.status_code, 404)
+
+    def test_authentication(self):
+        views = build_views(RecipeViewSet, {"get": "list"})
+
+        self.assertEqual(self.get(views[1], token="wrong").status_code, 401)
+        self.assertSame(views, token="wrong")
+        self.assertSame(views, token="two words")
+
+        request = self.factory.get("/")
+        self.assertEqual(views[1](request).render().status_code, 401)
+
+    def test_token_cached(self):
+        _, view = build_views(RecipeViewSet, {"get": "retrieve"})
+        self.get(view, route={"pk": self.recipe.id})
+
+        # the token is cached, leaving the recipe and its two prefetches
+        with self.assertNumQueries(3):
+            self.get(view, route={"pk": self.recipe.id})
+
+    @override_settings(RECIPE_LIST_CACHE=True)
+    def test_list_cached(self):
+        _, view = build_views(RecipeViewSet, {"get": "list"})
+        self.get(view)
+
+        with self.assertNumQueries(0):
+            res = self.get(view)
+        self.assertEqual(len(res.data["results"]), 5)
+
+    def test_conditional_list(self):
+        _, view = build_views(RecipeViewSet, {"get": "list"})
+        etag = self.get(view)["ETag"]
+
+        res = self.get(view, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+
+        cache.clear()
+        res = self.get(view, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+
+    def test_head(self):
+        _, view = build_views(RecipeViewSet, {"get": "list"})
+        request = self.factory.head("/", HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.assertEqual(view(request).render().status_code, 200)
+
+    def test_writes_use_sync_view(self):
+        _, view = build_views(RecipeViewSet, {"get": "list", "post": "create"})
+        request = self.factory.post(
+            "/",
+            {"title": "Stew", "time_minutes": 30, "price": "7.00"},
+            format="json",
+            HTTP_AUTHORIZATION=f"Token {self.token.key}",
+        )
+
+        res = view(request).render()
+
+        self.assertEqual(res.status_code, 201)
+        self.assertTrue(Recipe.objects.filter(title="Stew").exists())
+
+    def test_attr_lists(self):
+        for viewset in [TagViewSet, IngredientViewSet]:
+            with self.subTest(viewset=viewset.__name__):
+                views = build_views(viewset, {"get": "list"})
+                self.assertSame(views)
+                self.assertSame(views, data={"assigned_only": 1})
+                self.assertSame(views, data={"fields": "name"})
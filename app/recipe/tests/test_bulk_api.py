@@ -0,0 +1,184 @@
+"""
+Tests for the bulk update and delete recipe actions
+"""
+
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Ingredient, Recipe, Tag, Tombstone
+
+BULK_UPDATE_URL = reverse("recipe:recipe-bulk-update")
+BULK_DELETE_URL = reverse("recipe:recipe-bulk-delete")
+
+
+def create_recipe(user, **kwargs):
+    """Create and return a sample recipe"""
+    defaults = {"title": "sample title", "time_minutes": 5, "price": Decimal("5.50")}
+    defaults.update(kwargs)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class BulkApiTests(TestCase):
+    """Test the bulk recipe actions"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="shitman@example.com", password="shitman"
+        )
+        self.client.force_authenticate(self.user)
+        self.other = get_user_model().objects.create_user(email="other@example.com")
+
+    def test_bulk_update_fields(self):
+        """Test fields are changed on the given recipes only"""
+        r1 = create_recipe(user=self.user)
+        r2 = create_recipe(user=self.user)
+        untouched = create_recipe(user=self.user)
+        foreign = create_recipe(user=self.other)
+
+        payload = {"ids": [r1.id, r2.id, foreign.id], "changes": {"time_minutes": 30}}
+        res = self.client.post(BULK_UPDATE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["results"],
+            [
+                {"id": r1.id, "status": "updated"},
+                {"id": r2.id, "status": "updated"},
+                {"id": foreign.id, "status": "not_found"},
+            ],
+        )
+        for recipe, minutes in [(r1, 30), (r2, 30), (untouched, 5), (foreign, 5)]:
+            recipe.refresh_from_db()
+            self.assertEqual(recipe.time_minutes, minutes)
+
+    def test_bulk_update_tags(self):
+        """Test tags are added and removed across recipes"""
+        old = Tag.objects.create(user=self.user, name="Old")
+        r1 = create_recipe(user=self.user)
+        r2 = create_recipe(user=self.user)
+        r1.tags.add(old)
+
+        payload = {
+            "ids": [r1.id, r2.id],
+            "add_tags": [{"name": "New"}],
+            "remove_tags": [{"name": "Old"}],
+        }
+        self.client.post(BULK_UPDATE_URL, payload, format="json")
+
+        for recipe in [r1, r2]:
+            self.assertEqual(list(recipe.tags.values_list("name", flat=True)), ["New"])
+        self.assertEqual(Tag.objects.filter(user=self.user, name="New").count(), 1)
+
+    def test_bulk_update_repeated_names(self):
+        """Test names given twice are added once"""
+        recipe = create_recipe(user=self.user)
+
+        payload = {
+            "ids": [recipe.id],
+            "add_tags": [{"name": "New"}, {"name": "New"}],
+            "add_ingredients": [{"name": "Salt"}, {"name": "Salt"}],
+        }
+        res = self.client.post(BULK_UPDATE_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(recipe.tags.values_list("name", flat=True)), ["New"])
+        self.assertEqual(
+            list(recipe.ingredients.values_list("name", flat=True)), ["Salt"]
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_update_by_filter(self):
+        """Test the list filters select the recipes without ids"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        r1 = create_recipe(user=self.user)
+        r1.tags.add(tag)
+        r2 = create_recipe(user=self.user)
+
+        res = self.client.post(
+            f"{BULK_UPDATE_URL}?tags={tag.id}",
+            {"changes": {"price": "9.00"}},
+            format="json",
+        )
+
+        self.assertEqual(res.data["results"], [{"id": r1.id, "status": "updated"}])
+        r1.refresh_from_db()
+        r2.refresh_from_db()
+        self.assertEqual(r1.price, Decimal("9.00"))
+        self.assertEqual(r2.price, Decimal("5.50"))
+
+    def test_bulk_update_requires_selection_and_changes(self):
+        """Test a request without a selection or changes is rejected"""
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.post(
+            BULK_UPDATE_URL, {"changes": {"time_minutes": 1}}, format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(BULK_UPDATE_URL, {"ids": [recipe.id]}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_LIST_CACHE=True)
+    def test_bulk_update_invalidates_list_cache(self):
+        """Test a cached list reflects a bulk update"""
+        recipe = create_recipe(user=self.user)
+        list_url = reverse("recipe:recipe-list")
+        self.client.get(list_url)
+
+        self.client.post(
+            BULK_UPDATE_URL,
+            {"ids": [recipe.id], "changes": {"title": "Changed"}},
+            format="json",
+        )
+        res = self.client.get(list_url)
+
+        self.assertEqual(res.data["results"][0]["title"], "Changed")
+
+    def test_bulk_delete(self):
+        """Test the user's recipes are deleted and tombstoned"""
+        r1 = create_recipe(user=self.user)
+        r2 = create_recipe(user=self.user)
+        foreign = create_recipe(user=self.other)
+
+        payload = {"ids": [r1.id, foreign.id, 999999]}
+        res = self.client.post(BULK_DELETE_URL, payload, format="json")
+
+        self.assertEqual(
+            res.data["results"],
+            [
+                {"id": r1.id, "status": "deleted"},
+                {"id": foreign.id, "status": "not_found"},
+                {"id": 999999, "status": "not_found"},
+            ],
+        )
+        self.assertFalse(Recipe.objects.filter(id=r1.id).exists())
+        self.assertEqual(Recipe.objects.filter(id__in=[r2.id, foreign.id]).count(), 2)
+        self.assertTrue(
+            Tombstone.objects.filter(user=self.user, object_id=r1.id).exists()
+        )
+
+    def test_bulk_delete_by_filter(self):
+        """Test deleting the recipes matching a filter"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        r1 = create_recipe(user=self.user)
+        r1.tags.add(tag)
+        r2 = create_recipe(user=self.user)
+
+        res = self.client.post(f"{BULK_DELETE_URL}?tags={tag.id}", {}, format="json")
+
+        self.assertEqual(res.data["results"], [{"id": r1.id, "status": "deleted"}])
+        self.assertEqual(list(Recipe.objects.values_list("id", flat=True)), [r2.id])
+
+    def test_bulk_delete_requires_selection(self):
+        """Test a request without ids or a filter deletes nothing"""
+        create_recipe(user=self.user)
+
+        res = self.client.post(BULK_DELETE_URL, {}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Recipe.objects.count(), 1)
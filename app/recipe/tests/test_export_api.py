@@ -0,0 +1,148 @@
+"""
+Tests for the streaming recipe export
+"""
+
+import csv
+import io
+import json
+from decimal import Decimal
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag, Ingredient
+from recipe.export import CSV_FIELDS
+
+EXPORT_URL = reverse("recipe:recipe-export")
+
+
+def create_recipe(user, **kwargs):
+    """Create and return a sample recipe"""
+    defaults = {"title": "sample title", "time_minutes": 5, "price": Decimal("5.50")}
+    defaults.update(kwargs)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def read_body(res):
+    return b"".join(res.streaming_content).decode()
+
+
+class ExportApiTests(TestCase):
+    """Test exporting recipes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="shitman@example.com", password="shitman"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_export_ndjson(self):
+        """Test the default export is one JSON recipe per line"""
+        recipe = create_recipe(user=self.user, title="Soup")
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+        create_recipe(user=self.user, title="Stew")
+        create_recipe(
+            user=get_user_model().objects.create_user(email="other@example.com")
+        )
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        lines = [json.loads(line) for line in read_body(res).splitlines()]
+        self.assertEqual([r["title"] for r in lines], ["Stew", "Soup"])
+        self.assertEqual(
+            lines[1]["tags"], [{"id": lines[1]["tags"][0]["id"], "name": "Vegan"}]
+        )
+        self.assertEqual(lines[1]["price"], "5.50")
+
+    def test_export_csv(self):
+        """Test the csv export joins nested names into one column"""
+        recipe = create_recipe(user=self.user, title="Soup")
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="Salt"),
+            Ingredient.objects.create(user=self.user, name="Leek"),
+        )
+
+        res = self.client.get(EXPORT_URL, {"export_format": "csv"})
+
+        self.assertEqual(res["Content-Type"], "text/csv")
+        self.assertIn("recipes.csv", res["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(read_body(res))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["title"], "Soup")
+        self.assertEqual(sorted(rows[0]["ingredients"].split("|")), ["Leek", "Salt"])
+
+    def test_export_respects_filters(self):
+        """Test the list filters narrow the export"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        create_recipe(user=self.user, title="Soup").tags.add(tag)
+        create_recipe(user=self.user, title="Steak")
+
+        res = self.client.get(EXPORT_URL, {"tags": str(tag.id)})
+
+        lines = [json.loads(line) for line in read_body(res).splitlines()]
+        self.assertEqual([r["title"] for r in lines], ["Soup"])
+
+    def test_export_prefetches_per_chunk(self):
+        """Test queries grow with the number of chunks, not recipes"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        for i in range(5):
+            create_recipe(user=self.user, title=f"Recipe {i}").tags.add(tag)
+
+        with patch("recipe.export.EXPORT_CHUNK_SIZE", 2):
+            res = self.client.get(EXPORT_URL)
+            with CaptureQueriesContext(connection) as ctx:
+                lines = read_body(res).splitlines()
+
+        self.assertEqual(len(lines), 5)
+        # one tag and one ingredient prefetch for each of the 3 chunks
+        selects = [q for q in ctx.captured_queries if "core_recipe_" in q["sql"]]
+        self.assertEqual(len(selects), 6)
+
+    def test_export_unknown_format(self):
+        """Test an unsupported format is rejected"""
+        res = self.client.get(EXPORT_URL, {"export_format": "xml"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_format_from_accept(self):
+        """Test the export format can be chosen with the Accept header"""
+        create_recipe(user=self.user, title="Soup")
+
+        for media_type, first_line in [
+            ("text/csv", ",".join(CSV_FIELDS)),
+            ("application/x-ndjson", "{"),
+        ]:
+            with self.subTest(media_type=media_type):
+                res = self.client.get(EXPORT_URL, HTTP_ACCEPT=media_type)
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertEqual(res["Content-Type"], media_type)
+                self.assertTrue(read_body(res).startswith(first_line))
+
+    def test_export_error_rendered_as_json(self):
+        """Test errors of a CSV export request are still JSON"""
+        res = self.client.get(
+            EXPORT_URL, {"export_format": "xml"}, HTTP_ACCEPT="text/csv"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("export_format", res.json())
+
+    def test_export_csv_escapes_formulas(self):
+        """Test cells a spreadsheet would run as formulas are escaped"""
+        create_recipe(user=self.user, title="=HYPERLINK(1)", description="@SUM(A1)")
+
+        res = self.client.get(EXPORT_URL, {"export_format": "csv"})
+
+        row = list(csv.DictReader(io.StringIO(read_body(res))))[0]
+        self.assertEqual(row["title"], "'=HYPERLINK(1)")
+        self.assertEqual(row["description"], "'@SUM(A1)")
+        self.assertEqual(row["time_minutes"], "5")
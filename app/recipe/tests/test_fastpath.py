@@ -0,0 +1,100 @@
+"""
+Tests for the read only list fast path
+"""
+
+from decimal import Decimal
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag, Ingredient
+from recipe.fastpath import RowSerializer
+from recipe.serializers import (
+    RecipeSerializer,
+    RecipeDetailSerializer,
+    TagSerializer,
+    IngredientSerializer,
+)
+
+
+class RowSerializerParityTests(TestCase):
+    """Test the fast path renders exactly what the serializers do"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="shitman@example.com", password="shitman"
+        )
+        tags = [Tag.objects.create(user=self.user, name=n) for n in "CAB"]
+        salt = Ingredient.objects.create(user=self.user, name="Salt")
+        for price, link, linked in [
+            (Decimal("5.5"), "https://example.com", tags),
+            (Decimal("10"), "", tags[:1]),
+            (Decimal("0.99"), "", []),
+        ]:
+            recipe = Recipe.objects.create(
+                user=self.user, title="Soup", time_minutes=5, price=price, link=link
+            )
+            recipe.tags.add(*linked)
+            if linked:
+                recipe.ingredients.add(salt)
+
+    def assertParity(self, serializer_class, queryset, context=None):
+        context = context or {}
+        expected = serializer_class(queryset, many=True, context=context).data
+        fast = RowSerializer(serializer_class(context=context))
+        actual = fast.render(queryset.prefetch_related(None).values(*fast.columns))
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(JSONRenderer().render(actual), JSONRenderer().render(expected))
+
+    def _recipes(self, *related):
+        return Recipe.objects.order_by("-id").prefetch_related(
+            *[
+                Prefetch(name, queryset=model.objects.order_by("id"))
+                for name, model in related
+            ]
+        )
+
+    def test_recipe_parity(self):
+        self.assertParity(
+            RecipeSerializer, self._recipes(("tags", Tag), ("ingredients", Ingredient))
+        )
+
+    def test_recipe_sparse_parity(self):
+        context = {"fields": {"title", "price", "tags"}, "expand": set()}
+        self.assertParity(RecipeSerializer, self._recipes(("tags", Tag)), context)
+
+    def test_recipe_expanded_sparse_parity(self):
+        context = {"fields": {"id", "ingredients"}, "expand": {"ingredients"}}
+        self.assertParity(
+            RecipeSerializer, self._recipes(("ingredients", Ingredient)), context
+        )
+
+    def test_tag_parity(self):
+        self.assertParity(TagSerializer, Tag.objects.order_by("-name"))
+
+    def test_ingredient_parity(self):
+        self.assertParity(IngredientSerializer, Ingredient.objects.all())
+
+    def test_unsupported_fields_fall_back(self):
+        """Test serializers with file or custom fields are not mirrored"""
+        self.assertIsNone(RowSerializer.for_serializer(RecipeDetailSerializer()))
+
+    def test_list_endpoint_uses_fast_path(self):
+        """Test the list endpoint serves rows rendered by the fast path"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with patch.object(
+            RowSerializer, "render", autospec=True, side_effect=RowSerializer.render
+        ) as render:
+            res = client.get(reverse("recipe:recipe-list"))
+
+        render.assert_called_once()
+        expected = RecipeSerializer(
+            self._recipes(("tags", Tag), ("ingredients", Ingredient)), many=True
+        ).data
+        self.assertEqual(res.data["results"], expected)
@@ -0,0 +1,145 @@
+"""
+Tests for the bulk recipe import
+"""
+
+import json
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag, Ingredient
+from core.parsers import ORJSONParser
+
+IMPORT_URL = reverse("recipe:recipe-import-recipes")
+
+
+def sample_row(**kwargs):
+    row = {"title": "sample title", "time_minutes": 5, "price": "5.50"}
+    row.update(kwargs)
+    return row
+
+
+class ImportApiTests(TestCase):
+    """Test importing recipes in bulk"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="shitman@example.com", password="shitman"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_import_json_list(self):
+        """Test a JSON list creates recipes with their tags and ingredients"""
+        Tag.objects.create(user=self.user, name="Vegan")
+        rows = [
+            sample_row(title="Soup", tags=[{"name": "Vegan"}]),
+            sample_row(
+                title="Curry",
+                tags=[{"name": "Vegan"}, {"name": "Spicy"}],
+                ingredients=[{"name": "Rice"}],
+            ),
+        ]
+
+        res = self.client.post(IMPORT_URL, rows, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["errors"], [])
+        soup, curry = [Recipe.objects.get(id=i) for i in res.data["created"]]
+        self.assertEqual(soup.title, "Soup")
+        self.assertEqual(soup.user, self.user)
+        self.assertEqual(
+            sorted(curry.tags.values_list("name", flat=True)), ["Spicy", "Vegan"]
+        )
+        self.assertEqual(
+            list(curry.ingredients.values_list("name", flat=True)), ["Rice"]
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_import_uses_configured_json_parser(self):
+        """Test JSON imports are parsed by the api's JSON parser"""
+        with patch.object(
+            ORJSONParser, "parse", autospec=True, side_effect=ORJSONParser.parse
+        ) as parse:
+            res = self.client.post(IMPORT_URL, [sample_row()], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        parse.assert_called_once()
+
+    def test_import_ndjson(self):
+        """Test an NDJSON body is imported line by line"""
+        body = "\n".join(
+            json.dumps(sample_row(title=title)) for title in ["Soup", "Stew"]
+        )
+
+        res = self.client.post(IMPORT_URL, body, content_type="application/x-ndjson")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data["created"]), 2)
+
+    def test_import_reports_row_errors(self):
+        """Test invalid rows are reported while the valid ones are created"""
+        rows = [sample_row(title="Soup"), sample_row(time_minutes="soon")]
+
+        res = self.client.post(IMPORT_URL, rows, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data["created"]), 1)
+        self.assertEqual(res.data["errors"][0]["row"], 1)
+        self.assertIn("time_minutes", res.data["errors"][0]["errors"])
+
+    def test_import_all_invalid(self):
+        """Test nothing is created when every row is invalid"""
+        res = self.client.post(IMPORT_URL, [{"title": ""}], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_import_malformed_ndjson(self):
+        """Test a line that is not JSON rejects the request"""
+        res = self.client.post(
+            IMPORT_URL, '{"title": "Soup"}\n{oops', content_type="application/x-ndjson"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_IMPORT_MAX_ROWS=2)
+    def test_import_row_limit(self):
+        """Test requests above the row limit are rejected"""
+        res = self.client.post(IMPORT_URL, [sample_row()] * 3, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_import_queries_do_not_grow_with_rows(self):
+        """Test the writes are set based rather than one per recipe"""
+
+        def run(count):
+            rows = [
+                sample_row(
+                    tags=[{"name": f"Tag {i}"}], ingredients=[{"name": f"Salt {count}"}]
+                )
+                for i in range(count)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(IMPORT_URL, rows, format="json")
+            self.assertEqual(len(res.data["created"]), count)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(run(2), run(50))
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 2)
+
+    @override_settings(RECIPE_LIST_CACHE=True)
+    def test_import_invalidates_list_cache(self):
+        """Test imported recipes show up in a previously cached list"""
+        list_url = reverse("recipe:recipe-list")
+        self.client.get(list_url)
+
+        self.client.post(IMPORT_URL, [sample_row()], format="json")
+        res = self.client.get(list_url)
+
+        self.assertEqual(len(res.data["results"]), 1)
@@ -7,8 +7,10 @@ from rest_framework import status
 from core.models import Ingredient, Recipe
 
 from recipe.serializers import IngredientSerializer
+from recipe.views import trigram_enabled
 
 INGREDIENTS_URL = reverse("recipe:ingredient-list")
+AUTOCOMPLETE_URL = reverse("recipe:ingredient-autocomplete")
 
 
 def detail_url(ingredientid):
@@ -53,7 +55,7 @@ class PrivateIngredientAPITests(TestCase):
         serializer = IngredientSerializer(ingredients, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """Test retrieving ingredients limited to user"""
@@ -66,9 +68,9 @@ class PrivateIngredientAPITests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]["name"], ingredient.name)
-        self.assertEqual(res.data[0]["id"], ingredient.id)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["name"], ingredient.name)
+        self.assertEqual(res.data["results"][0]["id"], ingredient.id)
 
     def test_update_ingredient(self):
         """Test updating ingredient"""
@@ -113,5 +115,87 @@ class PrivateIngredientAPITests(TestCase):
         s1 = IngredientSerializer(in1)
         s2 = IngredientSerializer(in2)
 
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data["results"])
+        self.assertNotIn(s2.data, res.data["results"])
+
+    def test_filtered_ingredients_unique(self):
+        """Test assigned ingredients are listed once per ingredient"""
+        ingredient = Ingredient.objects.create(user=self.user, name="Eggs")
+        Ingredient.objects.create(user=self.user, name="Lentils")
+        for title in ["Eggs Benedict", "Herb Eggs"]:
+            recipe = Recipe.objects.create(
+                title=title, time_minutes=60, price=Decimal("7.00"), user=self.user
+            )
+            recipe.ingredients.add(ingredient)
+
+        res = self.client.get(INGREDIENTS_URL, {"assigned_only": 1})
+
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_autocomplete_prefix(self):
+        """Test autocomplete returns prefix matches, unpaginated"""
+        for name in ["Tomato paste", "tomato", "Potato", "Thyme"]:
+            Ingredient.objects.create(user=self.user, name=name)
+        Ingredient.objects.create(
+            user=create_user(email="other@example.com"), name="Tomatillo"
+        )
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "toma"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(i["name"] for i in res.data), ["Tomato paste", "tomato"]
+        )
+
+    def test_autocomplete_limit(self):
+        """Test q returns at most a handful of matches"""
+        Ingredient.objects.bulk_create(
+            [Ingredient(user=self.user, name=f"Salt {i}") for i in range(20)]
+        )
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "salt"})
+
+        self.assertEqual(len(res.data), 10)
+
+    def test_autocomplete_escapes_wildcards(self):
+        """Test LIKE wildcards in q are matched literally"""
+        Ingredient.objects.create(user=self.user, name="Salt")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "%"})
+
+        self.assertEqual(res.data, [])
+
+    def test_autocomplete_fuzzy(self):
+        """Test misspelt names match after the prefix matches"""
+        if not trigram_enabled():
+            self.skipTest("needs the pg_trgm extension")
+        Ingredient.objects.create(user=self.user, name="Tomato")
+        Ingredient.objects.create(user=self.user, name="Tomatillo")
+        Ingredient.objects.create(user=self.user, name="Basil")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "tomatto"})
+
+        self.assertEqual(res.data[0]["name"], "Tomato")
+        self.assertNotIn("Basil", [i["name"] for i in res.data])
+
+    def test_autocomplete_sparse_fields(self):
+        """Test fields narrows the autocomplete results"""
+        Ingredient.objects.create(user=self.user, name="Salt")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "salt", "fields": "name"})
+
+        self.assertEqual(res.data, [{"name": "Salt"}])
+
+    def test_autocomplete_requires_q(self):
+        """Test autocomplete without text is rejected"""
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": " "})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_ignores_q(self):
+        """Test the list stays paginated when q is passed"""
+        Ingredient.objects.create(user=self.user, name="Salt")
+
+        res = self.client.get(INGREDIENTS_URL, {"q": "salt"})
+
+        self.assertEqual(len(res.data["results"]), 1)
@@ -0,0 +1,227 @@
+"""
+Tests for caching of the recipe api list endpoints
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+
+
+def create_user(email="shitman@example.com", password="shitman"):
+    """Create and return a user"""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+@override_settings(RECIPE_LIST_CACHE=True)
+class ListCacheTests(TestCase):
+    """Test list responses are cached per user and invalidated on writes"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.payload = {
+            "title": "Sample",
+            "time_minutes": 5,
+            "price": Decimal("5.50"),
+            "tags": [{"name": "Vegan"}],
+        }
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list request does not hit the database"""
+        self.client.post(RECIPES_URL, self.payload, format="json")
+        res = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(RECIPES_URL)
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.data, res.data)
+
+    def test_cache_keyed_on_query_params(self):
+        """Test different filters are cached separately"""
+        res = self.client.post(RECIPES_URL, self.payload, format="json")
+        tag_id = res.data["tags"][0]["id"]
+        self.client.post(RECIPES_URL, {**self.payload, "tags": []}, format="json")
+
+        all_recipes = self.client.get(RECIPES_URL)
+        filtered = self.client.get(RECIPES_URL, {"tags": tag_id})
+
+        self.assertEqual(len(all_recipes.data["results"]), 2)
+        self.assertEqual(len(filtered.data["results"]), 1)
+
+    def test_cache_per_user(self):
+        """Test one user's cached list is never served to another"""
+        self.client.post(RECIPES_URL, self.payload, format="json")
+        self.client.get(RECIPES_URL)
+
+        other = APIClient()
+        other.force_authenticate(create_user(email="other@example.com"))
+        res = other.get(RECIPES_URL)
+
+        self.assertEqual(res.data["results"], [])
+
+    def test_create_invalidates_cache(self):
+        """Test creating a recipe invalidates recipe and tag lists"""
+        self.client.get(RECIPES_URL)
+        self.client.get(TAGS_URL)
+
+        self.client.post(RECIPES_URL, self.payload, format="json")
+
+        self.assertEqual(len(self.client.get(RECIPES_URL).data["results"]), 1)
+        self.assertEqual(len(self.client.get(TAGS_URL).data["results"]), 1)
+
+    def test_update_and_delete_invalidate_cache(self):
+        """Test updating and deleting a recipe invalidates the list"""
+        res = self.client.post(RECIPES_URL, self.payload, format="json")
+        url = reverse("recipe:recipe-detail", args=[res.data["id"]])
+        self.client.get(RECIPES_URL)
+
+        self.client.patch(url, {"title": "New title"})
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data["results"][0]["title"], "New title")
+
+        self.client.delete(url)
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data["results"], [])
+
+    def test_tag_update_invalidates_cache(self):
+        """Test renaming a tag invalidates the recipe list"""
+        self.client.post(RECIPES_URL, self.payload, format="json")
+        tag = Tag.objects.get(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        self.client.patch(
+            reverse("recipe:tag-detail", args=[tag.id]), {"name": "Desert"}
+        )
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data["results"][0]["tags"][0]["name"], "Desert")
+        self.assertTrue(Recipe.objects.filter(tags=tag).exists())
+
+    @override_settings(RECIPE_LIST_CACHE=False)
+    def test_not_cached_without_shared_cache(self):
+        """Test lists aren't cached where other processes can't invalidate them"""
+        self.client.post(RECIPES_URL, self.payload, format="json")
+        self.client.get(RECIPES_URL)
+        # as written by another process, which can't reach this one's cache
+        Recipe.objects.update(title="Changed")
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data["results"][0]["title"], "Changed")
+        self.assertIn("ETag", res)
+
+
+class ConditionalGetTests(TestCase):
+    """Test conditional GET support on the list endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        payload = {
+            "title": "Sample",
+            "time_minutes": 5,
+            "price": Decimal("5.50"),
+            "tags": [{"name": "Vegan"}],
+        }
+        self.recipe_id = self.client.post(RECIPES_URL, payload, format="json").data[
+            "id"
+        ]
+
+    def test_list_sets_validators(self):
+        """Test list responses carry an ETag and Last-Modified"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("ETag", res)
+        self.assertIn("Last-Modified", res)
+
+    def test_if_none_match_not_modified(self):
+        """Test a matching ETag returns 304 without serializing"""
+        etag = self.client.get(RECIPES_URL)["ETag"]
+        cache.clear()
+
+        # only the validators are computed
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+
+    @override_settings(RECIPE_LIST_CACHE=True)
+    def test_if_none_match_served_from_cache(self):
+        """Test a cached list answers conditional requests without queries"""
+        etag = self.client.get(RECIPES_URL)["ETag"]
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since_not_modified(self):
+        """Test an up to date If-Modified-Since returns 304"""
+        last_modified = self.client.get(TAGS_URL)["Last-Modified"]
+
+        res = self.client.get(TAGS_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_on_write(self):
+        """Test the ETag changes when a nested tag is renamed"""
+        etag = self.client.get(RECIPES_URL)["ETag"]
+        tag = Tag.objects.get(user=self.user)
+
+        self.client.patch(
+            reverse("recipe:tag-detail", args=[tag.id]), {"name": "Desert"}
+        )
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_etag_changes_on_delete(self):
+        """Test the ETag changes when a recipe is deleted"""
+        etag = self.client.get(RECIPES_URL)["ETag"]
+
+        self.client.delete(reverse("recipe:recipe-detail", args=[self.recipe_id]))
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_if_modified_since_after_delete(self):
+        """Test a delete moves Last-Modified past the client's copy"""
+        Recipe.objects.create(
+            user=self.user, title="Newer", time_minutes=5, price=Decimal("5.50")
+        )
+        # the earlier writes happened a second or more before the delete
+        earlier = timezone.now() - timedelta(minutes=1)
+        Recipe.objects.update(updated_at=earlier)
+        Tag.objects.update(updated_at=earlier)
+        recipes_modified = self.client.get(RECIPES_URL)["Last-Modified"]
+        tags_modified = self.client.get(TAGS_URL)["Last-Modified"]
+
+        self.client.delete(reverse("recipe:recipe-detail", args=[self.recipe_id]))
+        tag = Tag.objects.get(user=self.user)
+        self.client.delete(reverse("recipe:tag-detail", args=[tag.id]))
+        recipes = self.client.get(RECIPES_URL, HTTP_IF_MODIFIED_SINCE=recipes_modified)
+        tags = self.client.get(TAGS_URL, HTTP_IF_MODIFIED_SINCE=tags_modified)
+
+        self.assertEqual(recipes.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(recipes.data["results"]), 1)
+        self.assertEqual(tags.status_code, status.HTTP_200_OK)
+        self.assertEqual(tags.data["results"], [])
@@ -4,11 +4,15 @@ Tests for the recipe api
 
 from decimal import Decimal
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from unittest.mock import patch
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
-from core.models import Recipe, Tag, Ingredient
+from core.models import Recipe, Tag, Ingredient, StoredFile
+from recipe.cache import bump_version
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 import tempfile
 import os
@@ -76,7 +80,7 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         """Test list of recipes is limited only to the authenticated user"""
@@ -91,7 +95,7 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_get_recipe_detail(self):
         """Test getting recipe detail"""
@@ -391,6 +395,89 @@ class PrivateRecipeApiTests(TestCase):
 
         self.assertEqual(recipe.ingredients.count(), 0)
 
+    def test_create_recipe_with_duplicate_tag_names(self):
+        """Test repeated tag names in a payload map to a single tag"""
+        payload = {
+            "title": "Sample",
+            "time_minutes": 10,
+            "price": Decimal("2.50"),
+            "tags": [{"name": "Vegan"}, {"name": "Vegan"}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(pk=res.data["id"])
+        self.assertEqual(recipe.tags.count(), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_create_recipe_constant_queries(self):
+        """Test creating a recipe does not run queries per tag or ingredient"""
+        Ingredient.objects.create(user=self.user, name="Salt")
+
+        def payload(count):
+            return {
+                "title": "Sample",
+                "time_minutes": 10,
+                "price": Decimal("2.50"),
+                "tags": [{"name": f"tag {count} {i}"} for i in range(count)],
+                "ingredients": [{"name": "Salt"}]
+                + [{"name": f"ingredient {count} {i}"} for i in range(count)],
+            }
+
+        with CaptureQueriesContext(connection) as few:
+            res = self.client.post(RECIPES_URL, payload(1), format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connection) as many:
+            res = self.client.post(RECIPES_URL, payload(30), format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(len(few), len(many))
+        recipe = Recipe.objects.get(pk=res.data["id"])
+        self.assertEqual(recipe.tags.count(), 30)
+        self.assertEqual(recipe.ingredients.count(), 31)
+        self.assertEqual(Ingredient.objects.filter(name="Salt").count(), 1)
+
+    def _patch_writes(self, recipe, payload):
+        """PATCH a recipe and return the write statements it ran"""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(detail_url(recipe.id), payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [
+            q["sql"]
+            for q in ctx.captured_queries
+            if q["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+        ]
+
+    def test_update_unchanged_tags_writes_nothing(self):
+        """Test a PATCH that keeps the same tags does not rewrite links"""
+        recipe = create_recipe(user=self.user)
+        for name in ["Vegan", "Desert", "Quick"]:
+            recipe.tags.add(Tag.objects.create(user=self.user, name=name))
+        payload = {"tags": [{"name": "Vegan"}, {"name": "Desert"}, {"name": "Quick"}]}
+
+        writes = self._patch_writes(recipe, payload)
+
+        self.assertEqual(writes, [])
+        self.assertEqual(recipe.tags.count(), 3)
+
+    def test_update_one_tag_writes_one_link(self):
+        """Test swapping a single tag only touches that link"""
+        recipe = create_recipe(user=self.user)
+        for name in ["Vegan", "Desert", "Quick"]:
+            recipe.tags.add(Tag.objects.create(user=self.user, name=name))
+        Tag.objects.create(user=self.user, name="Slow")
+        payload = {"tags": [{"name": "Vegan"}, {"name": "Desert"}, {"name": "Slow"}]}
+
+        writes = self._patch_writes(recipe, payload)
+
+        self.assertEqual(len(writes), 3)
+        self.assertTrue(writes[0].startswith('DELETE FROM "core_recipe_tags"'))
+        self.assertTrue(writes[1].startswith('INSERT INTO "core_recipe_tags"'))
+        self.assertTrue(writes[2].startswith('UPDATE "core_recipe" SET "updated_at"'))
+        names = set(recipe.tags.values_list("name", flat=True))
+        self.assertEqual(names, {"Vegan", "Desert", "Slow"})
+
     def test_filter_by_tags(self):
         """Test filtering recipes by tags"""
         r1 = create_recipe(user=self.user, title="Chicken")
@@ -408,9 +495,9 @@ class PrivateRecipeApiTests(TestCase):
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data["results"])
+        self.assertIn(s2.data, res.data["results"])
+        self.assertNotIn(s3.data, res.data["results"])
 
     def test_filter_by_ingredients(self):
         """Test filtering recipes by ingredients"""
@@ -433,9 +520,151 @@ class PrivateRecipeApiTests(TestCase):
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
 
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data["results"])
+        self.assertIn(s2.data, res.data["results"])
+        self.assertNotIn(s3.data, res.data["results"])
+
+    def test_list_recipes_constant_queries(self):
+        """Test listing recipes does not run queries per recipe"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        ingredient = Ingredient.objects.create(user=self.user, name="Celery")
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+
+        # list validators, recipes, tags and ingredients
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data["results"]), 1)
+
+        for _ in range(5):
+            recipe = create_recipe(user=self.user)
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+        # written outside the api, so drop the cached first page by hand
+        bump_version(self.user.id)
+
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data["results"]), 6)
+        self.assertEqual(
+            res.data["results"][0]["tags"], [{"id": tag.id, "name": tag.name}]
+        )
+
+    def test_list_recipes_paginated(self):
+        """Test recipes are paginated by cursor, newest first"""
+        recipes = [create_recipe(user=self.user) for _ in range(3)]
+
+        res = self.client.get(RECIPES_URL, {"page_size": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [r["id"] for r in res.data["results"]]
+        self.assertEqual(ids, [recipes[2].id, recipes[1].id])
+        self.assertIsNone(res.data["previous"])
+
+        res = self.client.get(res.data["next"])
+
+        ids = [r["id"] for r in res.data["results"]]
+        self.assertEqual(ids, [recipes[0].id])
+        self.assertIsNone(res.data["next"])
+
+    @patch("recipe.pagination.BaseCursorPagination.max_page_size", 2)
+    def test_list_recipes_page_size_bounded(self):
+        """Test the requested page size is capped"""
+        for _ in range(3):
+            create_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, {"page_size": 500})
+
+        self.assertEqual(len(res.data["results"]), 2)
+        self.assertIsNotNone(res.data["next"])
+
+    def test_recipe_detail_constant_queries(self):
+        """Test retrieving a recipe prefetches its tags and ingredients"""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+        recipe.ingredients.add(Ingredient.objects.create(user=self.user, name="Salt"))
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(len(res.data["tags"]), 1)
+        self.assertEqual(len(res.data["ingredients"]), 1)
+
+    def test_filter_by_all_tags(self):
+        """Test filtering recipes that have every requested tag"""
+        tag1 = Tag.objects.create(user=self.user, name="Vegan")
+        tag2 = Tag.objects.create(user=self.user, name="Quick")
+        r1 = create_recipe(user=self.user, title="Salad")
+        r1.tags.add(tag1, tag2)
+        r2 = create_recipe(user=self.user, title="Stew")
+        r2.tags.add(tag1)
+
+        params = {"tags": f"{tag1.id},{tag2.id}", "match": "all"}
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual([r["id"] for r in res.data["results"]], [r1.id])
+
+    def test_filter_by_tags_no_duplicates(self):
+        """Test a recipe matching several tags is listed once without DISTINCT"""
+        tag1 = Tag.objects.create(user=self.user, name="Vegan")
+        tag2 = Tag.objects.create(user=self.user, name="Quick")
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag1, tag2)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL, {"tags": f"{tag1.id},{tag2.id}"})
+
+        self.assertEqual([r["id"] for r in res.data["results"]], [recipe.id])
+        for query in ctx.captured_queries:
+            self.assertNotIn("DISTINCT", query["sql"])
+
+    def test_list_sparse_fields(self):
+        """Test fields limits the output and skips the nested prefetches"""
+        recipe = create_recipe(user=self.user, title="Soup")
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+
+        # list validators and recipes only
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL, {"fields": "id,title"})
+
+        self.assertEqual(res.data["results"], [{"id": recipe.id, "title": "Soup"}])
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertNotIn("time_minutes", ctx.captured_queries[-1]["sql"])
+
+    def test_list_unexpanded_relation_as_ids(self):
+        """Test a requested relation is returned as ids unless expanded"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        create_recipe(user=self.user).tags.add(tag)
+
+        res = self.client.get(RECIPES_URL, {"fields": "id,tags"})
+        self.assertEqual(res.data["results"][0]["tags"], [tag.id])
+
+        res = self.client.get(RECIPES_URL, {"fields": "id,tags", "expand": "tags"})
+        self.assertEqual(
+            res.data["results"][0]["tags"], [{"id": tag.id, "name": "Vegan"}]
+        )
+
+    def test_detail_sparse_fields(self):
+        """Test fields applies to the detail view and its renamed fields"""
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.get(
+            detail_url(recipe.id), {"fields": "description,renditions"}
+        )
+
+        self.assertEqual(
+            res.data, {"description": recipe.description, "renditions": None}
+        )
+
+    def test_sparse_fields_ignored_on_write(self):
+        """Test fields does not narrow what an update validates or returns"""
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.patch(
+            f"{detail_url(recipe.id)}?fields=id", {"title": "Changed"}
+        )
+
+        self.assertEqual(res.data["title"], "Changed")
 
 
 class ImageUploadTests(TestCase):
@@ -474,3 +703,171 @@ class ImageUploadTests(TestCase):
 
         res = self.client.post(url, payload, format="multipart")
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(RECIPE_IMAGE_WORKERS=0)
+class ImageRenditionTests(TestCase):
+    """Tests for generating image renditions after upload"""
+
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root.name)
+        self.settings_override.enable()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="example@example.com", password="shitman"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def _upload(self, size=(2400, 1200), orientation=1):
+        exif = Image.Exif()
+        exif[0x010F] = "Camera Maker"
+        exif[0x0112] = orientation
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as image_file:
+            Image.new("RGB", size).save(image_file, format="JPEG", exif=exif)
+            image_file.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(
+                    image_upload_url(self.recipe.id),
+                    {"image": image_file},
+                    format="multipart",
+                )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def test_upload_generates_renditions(self):
+        """Test uploading an image produces resized renditions"""
+        self._upload()
+
+        self.recipe.refresh_from_db()
+        renditions = self.recipe.image_renditions
+        self.assertEqual(set(renditions), {"thumbnail", "medium", "large"})
+        with Image.open(
+            os.path.join(self.media_root.name, renditions["medium"])
+        ) as img:
+            self.assertEqual(img.format, "WEBP")
+            self.assertEqual(img.size, (960, 480))
+        with Image.open(
+            os.path.join(self.media_root.name, renditions["thumbnail"])
+        ) as img:
+            self.assertEqual(img.format, "JPEG")
+            self.assertEqual(max(img.size), 320)
+
+    def test_renditions_strip_exif(self):
+        """Test renditions carry no EXIF metadata"""
+        self._upload()
+
+        self.recipe.refresh_from_db()
+        for path in self.recipe.image_renditions.values():
+            with Image.open(os.path.join(self.media_root.name, path)) as img:
+                self.assertEqual(len(img.getexif()), 0)
+
+    def test_original_strips_exif(self):
+        """Test the stored original carries no EXIF metadata either"""
+        # rotated by 90 degrees, which is applied to the pixels instead
+        self._upload(orientation=6)
+
+        self.recipe.refresh_from_db()
+        with Image.open(self.recipe.image.path) as img:
+            self.assertEqual(len(img.getexif()), 0)
+            self.assertEqual(img.size, (1200, 2400))
+
+    @patch("recipe.images.generate_renditions", side_effect=OSError)
+    def test_inline_rendition_failure_logged(self, patched_generate):
+        """Test a failed rendition doesn't fail the committed upload"""
+        with self.assertLogs("recipe.images", level="ERROR"):
+            self._upload()
+
+        patched_generate.assert_called_once()
+        self.recipe.refresh_from_db()
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+
+    def test_small_image_not_upscaled(self):
+        """Test renditions never enlarge the original"""
+        self._upload(size=(100, 50))
+
+        self.recipe.refresh_from_db()
+        path = self.recipe.image_renditions["large"]
+        with Image.open(os.path.join(self.media_root.name, path)) as img:
+            self.assertEqual(img.size, (100, 50))
+
+    def test_detail_exposes_rendition_urls(self):
+        """Test the recipe detail lists rendition URLs once ready"""
+        self.assertIsNone(
+            self.client.get(detail_url(self.recipe.id)).data["renditions"]
+        )
+
+        self._upload()
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertTrue(res.data["renditions"]["thumbnail"].startswith("http://"))
+        self.assertTrue(res.data["renditions"]["large"].endswith(".webp"))
+
+    def test_replacing_image_removes_orphans(self):
+        """Test replacing an image deletes the old files nothing else uses"""
+        self._upload(size=(100, 50))
+        self.recipe.refresh_from_db()
+        old_paths = [self.recipe.image.name, *self.recipe.image_renditions.values()]
+
+        self._upload(size=(50, 100))
+
+        for path in old_paths:
+            self.assertFalse(os.path.exists(os.path.join(self.media_root.name, path)))
+        self.recipe.refresh_from_db()
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+
+    def test_upload_locks_recipe(self):
+        """Test concurrent uploads to a recipe are serialized"""
+        with CaptureQueriesContext(connection) as queries:
+            self._upload()
+
+        self.assertTrue(
+            any(
+                query["sql"].startswith('SELECT "core_recipe"')
+                and query["sql"].endswith("FOR UPDATE")
+                for query in queries
+            )
+        )
+
+    @patch("recipe.views.enqueue_renditions", side_effect=RuntimeError)
+    def test_failed_upload_takes_no_reference(self, patched_enqueue):
+        """Test a file stored by a failed upload is not kept referenced"""
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as image_file:
+            Image.new("RGB", (100, 50)).save(image_file, format="JPEG")
+            image_file.seek(0)
+            with self.assertRaises(RuntimeError):
+                self.client.post(
+                    image_upload_url(self.recipe.id),
+                    {"image": image_file},
+                    format="multipart",
+                )
+
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_identical_uploads_deduplicated(self):
+        """Test the same photo on two recipes is stored once"""
+        self._upload()
+        other = create_recipe(user=self.user)
+        self.recipe, first = other, self.recipe
+        self._upload()
+
+        first.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(first.image.name, other.image.name)
+        self.assertEqual(first.image_renditions, other.image_renditions)
+
+    @override_settings(RECIPE_IMAGE_WORKERS=2)
+    @patch("recipe.images.get_executor")
+    def test_upload_processed_off_request(self, patched_executor):
+        """Test renditions are handed to the worker pool"""
+        res = self._upload()
+
+        self.assertIsNone(res.data["renditions"])
+        patched_executor.return_value.submit.assert_called_once()
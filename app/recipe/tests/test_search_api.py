@@ -0,0 +1,95 @@
+"""
+Tests for recipe full text search
+"""
+
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def create_recipe(user, **kwargs):
+    """Create and return a sample recipe"""
+    defaults = {"title": "sample title", "time_minutes": 5, "price": Decimal("5.50")}
+    defaults.update(kwargs)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def titles(res):
+    return [r["title"] for r in res.data["results"]]
+
+
+class SearchApiTests(TestCase):
+    """Test the search parameter of the recipe list"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="shitman@example.com", password="shitman"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_search_matches_stemmed_words(self):
+        """Test title and description words match in any inflection"""
+        create_recipe(user=self.user, title="Tomato soup")
+        create_recipe(user=self.user, title="Stew", description="A hearty soup")
+        create_recipe(user=self.user, title="Pancakes")
+        create_recipe(
+            user=get_user_model().objects.create_user(email="other@example.com"),
+            title="Onion soup",
+        )
+
+        res = self.client.get(RECIPES_URL, {"search": "soups"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(titles(res)), ["Stew", "Tomato soup"])
+
+    def test_search_ranks_title_above_description(self):
+        """Test title matches are ranked ahead of description matches"""
+        create_recipe(user=self.user, title="Stew", description="Serve with curry")
+        create_recipe(user=self.user, title="Green curry")
+
+        res = self.client.get(RECIPES_URL, {"search": "curry"})
+
+        self.assertEqual(titles(res), ["Green curry", "Stew"])
+
+    def test_search_paginates_by_rank(self):
+        """Test cursor pages follow the ranking"""
+        create_recipe(user=self.user, title="Stew", description="Serve with curry")
+        create_recipe(user=self.user, title="Green curry")
+        create_recipe(user=self.user, title="Red curry")
+
+        res = self.client.get(RECIPES_URL, {"search": "curry", "page_size": 2})
+        seen = titles(res)
+        res = self.client.get(res.data["next"])
+        seen += titles(res)
+
+        self.assertEqual(len(seen), 3)
+        self.assertEqual(seen[-1], "Stew")
+        self.assertIsNone(res.data["next"])
+
+    def test_search_with_tag_filter(self):
+        """Test search combines with the tag filter"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        create_recipe(user=self.user, title="Lentil soup").tags.add(tag)
+        create_recipe(user=self.user, title="Chicken soup")
+
+        res = self.client.get(RECIPES_URL, {"search": "soup", "tags": str(tag.id)})
+
+        self.assertEqual(titles(res), ["Lentil soup"])
+
+    def test_search_follows_updates(self):
+        """Test the stored vector is refreshed when a recipe changes"""
+        recipe = create_recipe(user=self.user, title="Soup")
+        self.client.patch(
+            reverse("recipe:recipe-detail", args=[recipe.id]), {"title": "Salad"}
+        )
+
+        self.assertEqual(titles(self.client.get(RECIPES_URL, {"search": "soup"})), [])
+        res = self.client.get(RECIPES_URL, {"search": "salad"})
+        self.assertEqual(titles(res), ["Salad"])
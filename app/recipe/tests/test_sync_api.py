@@ -0,0 +1,176 @@
+"""
+Tests for the recipe delta sync api
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag, Ingredient, Tombstone
+
+CHANGES_URL = reverse("recipe:recipe-changes")
+
+
+def create_recipe(user, **kwargs):
+    """Create and return a sample recipe"""
+    defaults = {"title": "sample title", "time_minutes": 5, "price": Decimal("5.50")}
+    defaults.update(kwargs)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class SyncApiTests(TestCase):
+    """Test the changes endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="shitman@example.com", password="shitman"
+        )
+        self.client.force_authenticate(self.user)
+
+    def _sync_later(self, token, minutes=1):
+        """Sync as if the call happened a while after the token was issued"""
+        later = timezone.now() + timedelta(minutes=minutes)
+        with patch("django.utils.timezone.now", return_value=later):
+            return self.client.get(CHANGES_URL, {"token": token})
+
+    def test_full_sync_without_token(self):
+        """Test omitting the token returns the whole collection"""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+        Ingredient.objects.create(user=self.user, name="Salt")
+        create_recipe(
+            user=get_user_model().objects.create_user(email="other@example.com")
+        )
+
+        res = self.client.get(CHANGES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["id"] for r in res.data["recipes"]], [recipe.id])
+        self.assertEqual(len(res.data["tags"]), 1)
+        self.assertEqual(len(res.data["ingredients"]), 1)
+        self.assertEqual(
+            res.data["deleted"], {"recipes": [], "tags": [], "ingredients": []}
+        )
+        self.assertTrue(res.data["token"])
+
+    def test_sync_returns_only_changes(self):
+        """Test a token limits the response to rows changed since it"""
+        earlier = timezone.now() - timedelta(minutes=1)
+        with patch("django.utils.timezone.now", return_value=earlier):
+            old = create_recipe(user=self.user, title="Old")
+        token = self.client.get(CHANGES_URL).data["token"]
+
+        later = timezone.now() + timedelta(minutes=1)
+        with patch("django.utils.timezone.now", return_value=later):
+            new = create_recipe(user=self.user, title="New")
+            tag = Tag.objects.create(user=self.user, name="Vegan")
+        res = self._sync_later(token, minutes=2)
+
+        ids = [r["id"] for r in res.data["recipes"]]
+        self.assertIn(new.id, ids)
+        self.assertNotIn(old.id, ids)
+        self.assertEqual([t["id"] for t in res.data["tags"]], [tag.id])
+
+    def test_sync_returns_tombstones(self):
+        """Test deletions since the token are reported"""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        token = self.client.get(CHANGES_URL).data["token"]
+
+        self.client.delete(reverse("recipe:recipe-detail", args=[recipe.id]))
+        self.client.delete(reverse("recipe:tag-detail", args=[tag.id]))
+        res = self.client.get(CHANGES_URL, {"token": token})
+
+        self.assertEqual(res.data["deleted"]["recipes"], [recipe.id])
+        self.assertEqual(res.data["deleted"]["tags"], [tag.id])
+        self.assertEqual(res.data["recipes"], [])
+
+    def test_tag_rename_resends_recipe(self):
+        """Test recipes nesting a renamed tag are returned as changed"""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        recipe.tags.add(tag)
+        token = self.client.get(CHANGES_URL).data["token"]
+
+        later = timezone.now() + timedelta(minutes=1)
+        with patch("django.utils.timezone.now", return_value=later):
+            self.client.patch(
+                reverse("recipe:tag-detail", args=[tag.id]), {"name": "Desert"}
+            )
+        res = self._sync_later(token, minutes=2)
+
+        self.assertEqual([r["id"] for r in res.data["recipes"]], [recipe.id])
+        self.assertEqual(res.data["recipes"][0]["tags"][0]["name"], "Desert")
+
+    def test_invalid_token(self):
+        """Test a tampered token is rejected"""
+        res = self.client.get(CHANGES_URL, {"token": "not-a-token"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(SYNC_PAGE_SIZE=2)
+    def test_full_sync_paged(self):
+        """Test a full sync is returned a page at a time"""
+        recipes = [create_recipe(user=self.user) for _ in range(3)]
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+
+        first = self.client.get(CHANGES_URL)
+        second = self.client.get(CHANGES_URL, {"token": first.data["token"]})
+
+        self.assertTrue(first.data["has_more"])
+        self.assertEqual(
+            [r["id"] for r in first.data["recipes"]], [r.id for r in recipes[:2]]
+        )
+        self.assertEqual([t["id"] for t in first.data["tags"]], [tag.id])
+        self.assertFalse(second.data["has_more"])
+        self.assertEqual([r["id"] for r in second.data["recipes"]], [recipes[2].id])
+        self.assertEqual(second.data["tags"], [])
+
+    @override_settings(SYNC_PAGE_SIZE=1)
+    def test_changes_while_paging_resent(self):
+        """Test rows changed while a sync is paged are in the next sync"""
+        first, second = create_recipe(user=self.user), create_recipe(user=self.user)
+        page = self.client.get(CHANGES_URL)
+        later = timezone.now() + timedelta(minutes=1)
+        with patch("django.utils.timezone.now", return_value=later):
+            self.client.patch(
+                reverse("recipe:recipe-detail", args=[first.id]), {"title": "New"}
+            )
+
+        page = self._sync_later(page.data["token"], minutes=2)
+        self.assertEqual([r["id"] for r in page.data["recipes"]], [second.id])
+        res = self._sync_later(page.data["token"], minutes=3)
+
+        self.assertEqual([r["id"] for r in res.data["recipes"]], [first.id])
+        self.assertEqual(res.data["recipes"][0]["title"], "New")
+
+    def test_expired_token(self):
+        """Test tokens older than the tombstone retention are rejected"""
+        token = self.client.get(CHANGES_URL).data["token"]
+
+        res = self._sync_later(token, minutes=60 * 24 * 31)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_prune_tombstones(self):
+        """Test the command removes tombstones past the retention"""
+        old, recent = create_recipe(user=self.user), create_recipe(user=self.user)
+        recent_id = recent.id
+        long_ago = timezone.now() - timedelta(days=31)
+        with patch("django.utils.timezone.now", return_value=long_ago):
+            old.delete()
+        recent.delete()
+
+        call_command("prune_tombstones", stdout=StringIO())
+
+        self.assertEqual(
+            list(Tombstone.objects.values_list("object_id", flat=True)), [recent_id]
+        )
@@ -61,7 +61,7 @@ class PrivateTagApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test list of tags is limited to the current user"""
@@ -74,9 +74,9 @@ class PrivateTagApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]["name"], tag.name)
-        self.assertEqual(res.data[0]["id"], tag.id)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["name"], tag.name)
+        self.assertEqual(res.data["results"][0]["id"], tag.id)
 
     def test_update_tag(self):
         """Test updating a tag"""
@@ -91,6 +91,17 @@ class PrivateTagApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(tag.name, payload["name"])
 
+    def test_update_tag_duplicate_name(self):
+        """Test renaming a tag to an existing name returns an error"""
+        Tag.objects.create(user=self.user, name="Vegan")
+        tag = Tag.objects.create(user=self.user, name="Desert")
+
+        res = self.client.patch(detail_url(tag.id), {"name": "Vegan"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, "Desert")
+
     def test_delete_tag(self):
         """Test deleting a tag"""
 
@@ -103,3 +114,27 @@ class PrivateTagApiTests(TestCase):
         tags = Tag.objects.filter(user=self.user)
 
         self.assertFalse(tags.exists())
+
+    def test_list_tags_paginated(self):
+        """Test tags are paginated by cursor ordered by name"""
+        for name in ["Apple", "Banana", "Cherry"]:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {"page_size": 2})
+
+        names = [t["name"] for t in res.data["results"]]
+        self.assertEqual(names, ["Cherry", "Banana"])
+
+        res = self.client.get(res.data["next"])
+
+        names = [t["name"] for t in res.data["results"]]
+        self.assertEqual(names, ["Apple"])
+        self.assertIsNone(res.data["next"])
+
+    def test_list_tags_sparse_fields(self):
+        """Test fields limits the tag output"""
+        Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.get(TAGS_URL, {"fields": "name"})
+
+        self.assertEqual(res.data["results"], [{"name": "Vegan"}])
@@ -2,6 +2,31 @@
 Views for the recipe api
 """
 
+import functools
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramSimilarity,
+)
+from django.db.models import (
+    BooleanField,
+    Count,
+    Exists,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    OuterRef,
+    Prefetch,
+    Q,
+    Subquery,
+)
+from django.db.models.functions import Cast, Upper
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.translation import gettext as _
 from drf_spectacular.utils import (
     extend_schema,
     extend_schema_view,
@@ -9,43 +34,137 @@ from drf_spectacular.utils import (
     OpenApiTypes,
 )
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from core.models import Recipe, Tag, Ingredient
+from rest_framework.settings import api_settings
+from user.authentication import CachedTokenAuthentication
+from core.models import Recipe, Tag, Ingredient, Tombstone, SEARCH_CONFIG
+from core.messagepack import MessagePackMixin
+from core.storage import release_recipe_image
+from .asyncviews import AsyncReadMixin
+from .cache import CachedListMixin, ConditionalListMixin
+from .export import EXPORTERS, CSVRenderer, NDJSONRenderer
+from .fastpath import FastListMixin
+from .images import enqueue_renditions
+from .imports import import_recipes
+from .parsers import NDJSONParser
+from .pagination import RecipeCursorPagination, RecipeAttrCursorPagination
+from .sparse import SPARSE_PARAMETERS, SparseQuerysetMixin
+from .sync import make_token, read_token, sync_start
 from .serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
     TagSerializer,
     IngredientSerializer,
     RecipeImageSerializer,
+    RecipeBulkSelectionSerializer,
+    RecipeBulkUpdateSerializer,
+    RecipeBulkResultSerializer,
+    get_or_create_named,
 )  # noqa
 
 
+@functools.cache
+def trigram_enabled():
+    """Whether pg_trgm is installed, fuzzy autocomplete depends on it"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def recipe_links(relation):
+    """Return the through model of a Recipe m2m relation and its target column"""
+    field = Recipe._meta.get_field(relation)
+    return field.remote_field.through, f"{field.m2m_reverse_field_name()}_id"
+
+
+FILTER_PARAMETERS = [
+    OpenApiParameter(
+        "search",
+        OpenApiTypes.STR,
+        description="Full text search over title and description, ranks results",
+    ),
+    OpenApiParameter(
+        "tags",
+        OpenApiTypes.STR,
+        description="comma seperated list of ids to filter",
+    ),
+    OpenApiParameter(
+        "ingredients",
+        OpenApiTypes.STR,
+        description="Comma seperated list of ids to filter",
+    ),
+    OpenApiParameter(
+        "match",
+        OpenApiTypes.STR,
+        enum=["any", "all"],
+        description="Match recipes with any (default) or all of the ids",
+    ),
+]
+
+
 @extend_schema_view(
-    list=extend_schema(
-        parameters=[
+    list=extend_schema(parameters=FILTER_PARAMETERS + SPARSE_PARAMETERS),
+    retrieve=extend_schema(parameters=SPARSE_PARAMETERS),
+    export=extend_schema(
+        parameters=FILTER_PARAMETERS
+        + [
             OpenApiParameter(
-                "tags",
+                "export_format",
                 OpenApiTypes.STR,
-                description="comma seperated list of ids to filter",
+                enum=list(EXPORTERS),
+                description="File format of the export, ndjson by default",
             ),
+        ],
+        responses={(200, "application/x-ndjson"): bytes, (200, "text/csv"): bytes},
+    ),
+    import_recipes=extend_schema(
+        request=RecipeDetailSerializer(many=True),
+        responses={(201, "application/json"): OpenApiTypes.OBJECT},
+    ),
+    bulk_update=extend_schema(
+        parameters=FILTER_PARAMETERS,
+        request=RecipeBulkUpdateSerializer,
+        responses=RecipeBulkResultSerializer,
+    ),
+    bulk_delete=extend_schema(
+        parameters=FILTER_PARAMETERS,
+        request=RecipeBulkSelectionSerializer,
+        responses=RecipeBulkResultSerializer,
+    ),
+    changes=extend_schema(
+        parameters=[
             OpenApiParameter(
-                "ingredients",
+                "token",
                 OpenApiTypes.STR,
-                description="Comma seperated list of ids to filter",
+                description=(
+                    "Sync token from a previous response, omit for a full sync. "
+                    "While has_more is set, its token fetches the next page."
+                ),
             ),
         ]
-    )
+    ),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    MessagePackMixin,
+    SparseQuerysetMixin,
+    CachedListMixin,
+    ConditionalListMixin,
+    FastListMixin,
+    AsyncReadMixin,
+    viewsets.ModelViewSet,
+):
     """View for managing recipe APIs"""
 
     serializer_class = RecipeDetailSerializer
-    queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    # the search vector is only ever read by the database
+    queryset = Recipe.objects.defer("search_vector")
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
+    field_sources = {"renditions": "image_renditions"}
 
     def _params_to_int(self, qs):
         """Convert a list of strings to integers"""
@@ -56,53 +175,341 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         tags = self.request.query_params.get("tags")
         ingredients = self.request.query_params.get("ingredients")
+        match_all = self.request.query_params.get("match") == "all"
+        search = self.request.query_params.get("search")
 
         queryset = self.queryset
 
         if tags:
             tags_ids = self._params_to_int(tags)
-            queryset = queryset.filter(tags__id__in=tags_ids)
+            queryset = self._filter_linked(queryset, "tags", tags_ids, match_all)
         if ingredients:
             ingredients_ids = self._params_to_int(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_ids)
+            queryset = self._filter_linked(
+                queryset, "ingredients", ingredients_ids, match_all
+            )
+
+        queryset = self._prefetch_related(queryset)
+        queryset = self.only_requested(queryset)
+        queryset = queryset.filter(user=self.request.user)
+
+        if search:
+            return self._search(queryset, search).order_by("-rank", "-id")
+        return queryset.order_by("-id")
 
-        return queryset.filter(user=self.request.user).order_by("-id").distinct()
+    def _search(self, queryset, text):
+        """Filter recipes matching the search text, annotated with their rank"""
+        query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+        # ts_rank is a real, as a double it round trips through the page cursor
+        return queryset.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F("search_vector"), query), FloatField())
+        )
+
+    def _filter_linked(self, queryset, relation, ids, match_all):
+        """Filter recipes linked to any (or all) of the ids without joining rows"""
+        through, target = recipe_links(relation)
+        links = through.objects.filter(
+            recipe_id=OuterRef("pk"), **{f"{target}__in": ids}
+        )
+        if not match_all:
+            return queryset.filter(Exists(links))
+
+        matched = links.order_by().values("recipe_id").annotate(n=Count("*"))
+        return queryset.alias(matched=Subquery(matched.values("n"))).filter(
+            matched=len(set(ids))
+        )
+
+    def _prefetch_related(self, queryset):
+        """Prefetch the nested tags and ingredients for read actions"""
+        if self.action not in ("list", "retrieve", "changes", "export"):
+            return queryset
+
+        fields = self.requested_fields()
+        expand = self.requested_expansions()
+        prefetches = []
+        for relation, model in [("tags", Tag), ("ingredients", Ingredient)]:
+            if fields is not None and relation not in fields:
+                continue
+            # unexpanded relations are rendered as ids
+            expanded = fields is None or relation in expand
+            columns = ["id", "name"] if expanded else ["id"]
+            # ordered like the list fast path reads the through tables
+            related = model.objects.only(*columns).order_by("id")
+            prefetches.append(Prefetch(relation, queryset=related))
+        return queryset.prefetch_related(*prefetches)
 
     def get_serializer_class(self):
         if self.action == "list":
             return RecipeSerializer
         elif self.action == "upload_image":
             return RecipeImageSerializer
+        elif self.action == "bulk_update":
+            return RecipeBulkUpdateSerializer
+        elif self.action == "bulk_delete":
+            return RecipeBulkSelectionSerializer
         return self.serializer_class
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+        self.invalidate_list_cache()
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.invalidate_list_cache()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        self.invalidate_list_cache()
 
     @action(methods=["POST"], detail=True, url_path="upload-image")
     def upload_image(self, request, pk=None):
         """Upload an image to recipe"""
         recipe = self.get_object()
 
-        serializer = self.get_serializer(recipe, data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            # a concurrent upload waits, so each old image is released once
+            recipe = Recipe.objects.select_for_update().get(pk=recipe.pk)
+            serializer = self.get_serializer(recipe, data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            transaction.on_commit(
+                functools.partial(
+                    release_recipe_image, recipe.image.name, recipe.image_renditions
+                )
+            )
+            serializer.save(image_renditions={})
+            enqueue_renditions(serializer.instance)
+        self.invalidate_list_cache()
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def perform_content_negotiation(self, request, force=False):
+        renderer, media_type = super().perform_content_negotiation(request, force)
+        if renderer.format in EXPORTERS:
+            # exports stream themselves, errors are still rendered as JSON
+            self.export_format = renderer.format
+            renderer = self.get_renderers()[0]
+            media_type = renderer.media_type
+        return renderer, media_type
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        renderer_classes=[
+            *api_settings.DEFAULT_RENDERER_CLASSES,
+            NDJSONRenderer,
+            CSVRenderer,
+        ],
+    )
+    def export(self, request):
+        """Stream every recipe of the user as NDJSON or CSV"""
+        export_format = request.query_params.get(
+            "export_format", getattr(self, "export_format", "ndjson")
+        )
+        if export_format not in EXPORTERS:
+            raise ValidationError({"export_format": _("Unsupported export format.")})
+
+        exporter, content_type = EXPORTERS[export_format]
+        rows = exporter(self.get_queryset(), self.get_serializer_context())
+        response = StreamingHttpResponse(rows, content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="recipes.{export_format}"'
+        )
+        return response
+
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="import",
+        parser_classes=[*api_settings.DEFAULT_PARSER_CLASSES, NDJSONParser],
+    )
+    def import_recipes(self, request):
+        """Create many recipes from a JSON list or an NDJSON body"""
+        rows = request.data
+        if not isinstance(rows, list):
+            raise ValidationError(
+                {"non_field_errors": [_("Expected a list of recipes.")]}
+            )
+        if len(rows) > settings.RECIPE_IMPORT_MAX_ROWS:
+            raise ValidationError(
+                {
+                    "non_field_errors": [
+                        _("Import at most %(max)d recipes per request.")
+                        % {"max": settings.RECIPE_IMPORT_MAX_ROWS}
+                    ]
+                }
+            )
+
+        ids, errors = import_recipes(rows, self.get_serializer_context())
+        if ids:
+            self.invalidate_list_cache()
+        return Response(
+            {"created": ids, "errors": errors},
+            status=status.HTTP_201_CREATED if ids else status.HTTP_400_BAD_REQUEST,
+        )
+
+    def _bulk_select(self, serializer):
+        """Return the requested ids and the ids of the user's matching recipes"""
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data.get("ids")
+        queryset = self.get_queryset()
+        if ids is not None:
+            queryset = queryset.filter(id__in=ids)
+        elif not any(p in self.request.query_params for p in ("tags", "ingredients")):
+            raise ValidationError(
+                {"ids": [_("Provide ids or a tags or ingredients filter.")]}
+            )
+        return ids, list(queryset.values_list("id", flat=True))
+
+    def _bulk_result(self, ids, matched, result):
+        """Report the outcome per requested id, not_found for the others"""
+        requested = sorted(matched) if ids is None else dict.fromkeys(ids)
+        matched = set(matched)
+        results = [
+            {"id": pk, "status": result if pk in matched else "not_found"}
+            for pk in requested
+        ]
+        return Response({"results": results})
+
+    @action(methods=["POST"], detail=False, url_path="bulk-update")
+    def bulk_update(self, request):
+        """Change fields and tags or ingredients of many recipes at once"""
+        serializer = self.get_serializer(data=request.data)
+        ids, matched = self._bulk_select(serializer)
+        data = serializer.validated_data
+
+        if matched:
+            with transaction.atomic():
+                for relation, model in [("tags", Tag), ("ingredients", Ingredient)]:
+                    through, target = recipe_links(relation)
+                    names = [
+                        item["name"] for item in data.get(f"remove_{relation}", [])
+                    ]
+                    if names:
+                        through.objects.filter(
+                            recipe_id__in=matched,
+                            **{
+                                f"{target}__in": model.objects.filter(
+                                    user=request.user, name__in=names
+                                )
+                            },
+                        ).delete()
+
+                    names = list(
+                        dict.fromkeys(
+                            item["name"] for item in data.get(f"add_{relation}", [])
+                        )
+                    )
+                    objs = get_or_create_named(model, request.user, names)
+                    through.objects.bulk_create(
+                        [
+                            through(recipe_id=recipe_id, **{target: obj.id})
+                            for recipe_id in matched
+                            for obj in objs.values()
+                        ],
+                        ignore_conflicts=True,
+                    )
+
+                Recipe.objects.filter(id__in=matched).update(
+                    **data.get("changes", {}), updated_at=timezone.now()
+                )
+            self.invalidate_list_cache()
+        return self._bulk_result(ids, matched, "updated")
+
+    @action(methods=["POST"], detail=False, url_path="bulk-delete")
+    def bulk_delete(self, request):
+        """Delete many recipes at once"""
+        serializer = self.get_serializer(data=request.data)
+        ids, matched = self._bulk_select(serializer)
+
+        if matched:
+            # the post_delete signals still record tombstones and release images
+            Recipe.objects.filter(id__in=matched).delete()
+            self.invalidate_list_cache()
+        return self._bulk_result(ids, matched, "deleted")
+
+    @action(methods=["GET"], detail=False)
+    def changes(self, request):
+        """Return recipes, tags and ingredients changed since a sync token"""
+        token = request.query_params.get("token")
+        since, resume, after = read_token(token) if token else (None, None, {})
+        resume = resume or sync_start(timezone.now())
+        changed = {
+            "recipes": self.get_queryset(),
+            "tags": Tag.objects.filter(user=request.user),
+            "ingredients": Ingredient.objects.filter(user=request.user),
+            "deleted": Tombstone.objects.filter(user=request.user),
+        }
+        if since is None:
+            # a full sync has no copies to delete
+            changed["deleted"] = changed["deleted"].none()
+
+        # every collection is paged by id, the rows changed while paging are
+        # sent again by the sync after the last page
+        pages, has_more = {}, False
+        for name, queryset in changed.items():
+            if since is not None:
+                stamp = "deleted_at" if name == "deleted" else "updated_at"
+                queryset = queryset.filter(**{f"{stamp}__gte": since})
+            queryset = queryset.filter(id__gt=after.get(name, 0)).order_by("id")
+            rows = list(queryset[: settings.SYNC_PAGE_SIZE + 1])
+            has_more |= len(rows) > settings.SYNC_PAGE_SIZE
+            pages[name] = rows[: settings.SYNC_PAGE_SIZE]
+            if pages[name]:
+                after[name] = pages[name][-1].id
+
+        deleted = {"recipe": [], "tag": [], "ingredient": []}
+        for tombstone in pages["deleted"]:
+            deleted[tombstone.model].append(tombstone.object_id)
+        return Response(
+            {
+                "recipes": self.get_serializer(pages["recipes"], many=True).data,
+                "tags": TagSerializer(pages["tags"], many=True).data,
+                "ingredients": IngredientSerializer(
+                    pages["ingredients"], many=True
+                ).data,
+                "deleted": {
+                    "recipes": deleted["recipe"],
+                    "tags": deleted["tag"],
+                    "ingredients": deleted["ingredient"],
+                },
+                "has_more": has_more,
+                "token": (
+                    make_token(since, resume, after) if has_more else make_token(resume)
+                ),
+            }
+        )
+
+
+ASSIGNED_ONLY_PARAMETER = OpenApiParameter(
+    "assigned_only",
+    OpenApiTypes.INT,
+    enum=[0, 1],
+    description="Filter by items assigned to recipes.",
+)
 
 
 @extend_schema_view(
-    list=extend_schema(
+    list=extend_schema(parameters=[ASSIGNED_ONLY_PARAMETER, *SPARSE_PARAMETERS]),
+    autocomplete=extend_schema(
         parameters=[
             OpenApiParameter(
-                "assigned_only",
-                OpenApiTypes.INT,
-                enum=[0, 1],
-                description="Filter by items assigned to recipes.",
-            )
+                "q",
+                OpenApiTypes.STR,
+                required=True,
+                description="Text to complete, prefix matches come first",
+            ),
+            ASSIGNED_ONLY_PARAMETER,
+            *SPARSE_PARAMETERS,
         ]
-    )
+    ),
 )
 class BaseRecipeAttrViewSet(
+    MessagePackMixin,
+    SparseQuerysetMixin,
+    CachedListMixin,
+    ConditionalListMixin,
+    FastListMixin,
+    AsyncReadMixin,
     mixins.DestroyModelMixin,
     mixins.UpdateModelMixin,
     mixins.ListModelMixin,
@@ -110,27 +517,93 @@ class BaseRecipeAttrViewSet(
 ):
     """Base Viewset for recipe attributes"""
 
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeAttrCursorPagination
+    sparse_actions = ("list", "retrieve", "autocomplete")
+    autocomplete_limit = 10
 
     def get_queryset(self):
         assigned_only = bool(int(self.request.query_params.get("assigned_only", 0)))
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            through, target = recipe_links(self.recipe_relation)
+            queryset = queryset.filter(
+                Exists(through.objects.filter(**{target: OuterRef("pk")}))
+            )
+
+        # name is always loaded, the pagination cursor reads it
+        queryset = self.only_requested(queryset, "name")
+        queryset = queryset.filter(user=self.request.user)
+        if self.action == "autocomplete":
+            text = self.request.query_params.get("q", "").strip()
+            return self._autocomplete(queryset, text)
+        return queryset.order_by("-name", "-id")
+
+    def _autocomplete(self, queryset, text):
+        """Return the best matches for the text, prefix matches first"""
+        queryset = queryset.alias(
+            upper_name=Upper("name"),
+            is_prefix=ExpressionWrapper(
+                Q(upper_name__startswith=text.upper()), output_field=BooleanField()
+            ),
+        )
+        if not trigram_enabled():
+            queryset = queryset.filter(is_prefix=True)
+            return queryset.order_by("name", "id")[: self.autocomplete_limit]
 
-        return queryset.filter(user=self.request.user).order_by("-name").distinct()
+        queryset = queryset.filter(
+            Q(is_prefix=True) | Q(upper_name__trigram_similar=text)
+        ).alias(similarity=TrigramSimilarity("upper_name", text.upper()))
+        return queryset.order_by("-is_prefix", "-similarity", "name", "id")[
+            : self.autocomplete_limit
+        ]
+
+    @action(methods=["GET"], detail=False, pagination_class=None)
+    def autocomplete(self, request):
+        """Return the best few name matches for q, unpaginated"""
+        if not request.query_params.get("q", "").strip():
+            raise ValidationError({"q": [_("This parameter is required.")]})
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(self.get_serializer(queryset, many=True).data)
+
+    def _touch_recipes(self, instance):
+        """Mark the recipes nesting this item as modified"""
+        instance.recipe_set.update(updated_at=timezone.now())
+
+    def perform_update(self, serializer):
+        try:
+            with transaction.atomic():
+                serializer.save()
+                self._touch_recipes(serializer.instance)
+        except IntegrityError:
+            raise ValidationError(
+                {"name": _("You already have an item with this name.")}
+            )
+        self.invalidate_list_cache()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            self._touch_recipes(instance)
+            super().perform_destroy(instance)
+        self.invalidate_list_cache()
 
 
+@extend_schema_view(autocomplete=extend_schema(responses=TagSerializer(many=True)))
 class TagViewSet(BaseRecipeAttrViewSet):
     """View for managing tags"""
 
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
+    recipe_relation = "tags"
 
 
+@extend_schema_view(
+    autocomplete=extend_schema(responses=IngredientSerializer(many=True))
+)
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """Views for the ingredients"""
 
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
+    recipe_relation = "ingredients"
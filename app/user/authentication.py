@@ -0,0 +1,128 @@
+"""
+Authentication classes for the api
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+
+class LocalTokenCache:
+    """Bounded, thread safe LRU of tokens with a per-entry TTL"""
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            token, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return token
+
+    def set(self, key, token):
+        with self._lock:
+            self._entries[key] = (token, time.monotonic() + self.timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_tokens = LocalTokenCache(
+    settings.AUTH_TOKEN_LOCAL_CACHE_SIZE, settings.AUTH_TOKEN_LOCAL_CACHE_TIMEOUT
+)
+
+
+def _shared_key(key):
+    # never put the raw credential in the cache backend
+    return f"auth:token:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def invalidate_token(key):
+    """Drop a token from both cache tiers"""
+    local_tokens.delete(key)
+    cache.delete(_shared_key(key))
+
+
+def _cache_entry(token):
+    """Return what is cached of a token, its user without the password hash"""
+    user = token.user
+    fields = [
+        field.attname
+        for field in user._meta.concrete_fields
+        if field.name != "password"
+    ]
+    return token.key, token.created, {name: getattr(user, name) for name in fields}
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that skips the token lookup for recently seen keys"""
+
+    def _from_entry(self, entry):
+        # fresh instances per request, views may modify request.user
+        key, created, fields = entry
+        user = get_user_model().from_db(None, list(fields), list(fields.values()))
+        return user, self.get_model()(key=key, user=user, created=created)
+
+    def authenticate_credentials(self, key):
+        entry = local_tokens.get(key)
+        if entry is None and settings.AUTH_TOKEN_SHARED_CACHE:
+            entry = cache.get(_shared_key(key))
+        if entry is None:
+            _, token = super().authenticate_credentials(key)
+            entry = _cache_entry(token)
+            if settings.AUTH_TOKEN_SHARED_CACHE:
+                cache.set(_shared_key(key), entry, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        local_tokens.set(key, entry)
+        return self._from_entry(entry)
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views, awaiting the cache and token lookups"""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        try:
+            key = auth[1].decode() if len(auth) == 2 else None
+        except UnicodeError:
+            key = None
+        if key is None:
+            # a malformed header, authenticate() raises without any lookup
+            return self.authenticate(request)
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        entry = local_tokens.get(key)
+        if entry is None and settings.AUTH_TOKEN_SHARED_CACHE:
+            entry = await cache.aget(_shared_key(key))
+        if entry is None:
+            _, token = await sync_to_async(super().authenticate_credentials)(key)
+            entry = _cache_entry(token)
+            if settings.AUTH_TOKEN_SHARED_CACHE:
+                await cache.aset(
+                    _shared_key(key), entry, settings.AUTH_TOKEN_CACHE_TIMEOUT
+                )
+        local_tokens.set(key, entry)
+        return self._from_entry(entry)
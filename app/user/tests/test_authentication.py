@@ -0,0 +1,130 @@
+"""
+Tests for the cached token authentication
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from user.authentication import _shared_key, local_tokens
+
+ME_URL = reverse("user:me")
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating with a cached token"""
+
+    def setUp(self):
+        cache.clear()
+        local_tokens.clear()
+        self.user = get_user_model().objects.create_user(
+            email="shitman@example.com", password="shitman", name="Shitman"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_token_lookup_cached(self):
+        """Test repeated requests skip the token query"""
+        # the token lookup, then the profile is read from the database
+        with self.assertNumQueries(2):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.data["email"], self.user.email)
+
+    @override_settings(AUTH_TOKEN_SHARED_CACHE=True)
+    def test_shared_cache_tier(self):
+        """Test a process with an empty LRU uses the shared cache"""
+        self.client.get(ME_URL)
+        local_tokens.clear()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(AUTH_TOKEN_SHARED_CACHE=True)
+    def test_shared_cache_without_password(self):
+        """Test the shared cache entry leaves out the password hash"""
+        self.client.get(ME_URL)
+
+        entry = cache.get(_shared_key(self.token.key))
+
+        self.assertIsNotNone(entry)
+        self.assertNotIn(self.user.password, repr(entry))
+
+    def test_per_process_cache_not_shared(self):
+        """Test tokens stay out of a cache other processes can't invalidate"""
+        self.client.get(ME_URL)
+
+        self.assertIsNone(cache.get(_shared_key(self.token.key)))
+
+    def test_update_with_stale_cached_user(self):
+        """Test a profile update doesn't write back the cached user"""
+        self.client.get(ME_URL)
+        # deactivated by another process, this one's cache still has the user
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+
+        self.client.patch(ME_URL, {"name": "New name"})
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, "New name")
+        self.assertFalse(self.user.is_active)
+
+    def test_invalid_token(self):
+        """Test an unknown token is rejected"""
+        self.client.credentials(HTTP_AUTHORIZATION="Token not-a-token")
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_invalidated(self):
+        """Test deleting a token stops it authenticating straight away"""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_invalidated(self):
+        """Test deactivating a user stops their token authenticating"""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_updated_user_not_stale(self):
+        """Test profile changes show up on the next request"""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {"name": "New name"})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data["name"], "New name")
+
+    def test_local_cache_bounded(self):
+        """Test the in-process LRU evicts the least recently used token"""
+        original_size = local_tokens.size
+        local_tokens.size = 1
+        try:
+            other = get_user_model().objects.create_user(email="other@example.com")
+            other_token = Token.objects.create(user=other)
+            self.client.get(ME_URL)
+            other_client = APIClient()
+            other_client.credentials(HTTP_AUTHORIZATION=f"Token {other_token.key}")
+            other_client.get(ME_URL)
+
+            self.assertIsNone(local_tokens.get(self.token.key))
+            self.assertIsNotNone(local_tokens.get(other_token.key))
+        finally:
+            local_tokens.size = original_size
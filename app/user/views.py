@@ -2,32 +2,36 @@
 Views for the user API
 """
 
-from rest_framework import generics, permissions, authentication
+from django.contrib.auth import get_user_model
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from user.serializers import UserSerializer, AuthTokenSerializer
 from rest_framework.settings import api_settings
+from user.authentication import CachedTokenAuthentication
+from core.messagepack import MessagePackMixin
 
 
-class CreateUserView(generics.CreateAPIView):
+class CreateUserView(MessagePackMixin, generics.CreateAPIView):
     """Create a new user in the system"""
 
     serializer_class = UserSerializer
 
 
-class CreateTokenView(ObtainAuthToken):
+class CreateTokenView(MessagePackMixin, ObtainAuthToken):
     """Create a new auth token for the user"""
 
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(MessagePackMixin, generics.RetrieveUpdateAPIView):
     """Manage the authenticated user."""
 
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         """Retrieve and return the authenticated user"""
-        return self.request.user
+        # request.user may be a cached copy, updates must not write it back
+        return get_user_model().objects.get(pk=self.request.user.pk)